@@ -0,0 +1,203 @@
+"""Historical archive of articles, analyses and whale transfers
+
+Records are batched in memory by a background thread and appended to
+gzip-compressed JSONL files partitioned by kind and hour:
+
+    archive/<kind>/<YYYY-MM-DD>/<HH>.jsonl.gz
+
+The directory layout is the time index - queries only open the partitions
+that overlap the requested range.
+
+Query examples:
+    python archive.py query analysis --coin ETH --importance CRITICAL --since 7d
+    python archive.py query transfer --coin BTC --min-usd 5000000 --group-by day
+
+--coin matches a transfer's symbol or the coins detected in an article or
+analysis.
+"""
+import argparse
+import atexit
+import gzip
+import json
+import logging
+import os
+import queue
+import re
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "archive")
+ARCHIVE_ENABLED = os.getenv("ARCHIVE_ENABLED", "true").lower() == "true"
+ARCHIVE_FLUSH_SECONDS = int(os.getenv("ARCHIVE_FLUSH_SECONDS", "10"))
+ARCHIVE_BATCH_SIZE = 500
+
+KINDS = ("article", "analysis", "transfer")
+
+logger = logging.getLogger(__name__)
+
+def to_dict(record):
+    """Plain dict from a __slots__ record (or a dict)"""
+    if isinstance(record, dict):
+        return dict(record)
+    return {name: getattr(record, name) for name in record.__slots__}
+
+def partition_path(kind, ts, base=ARCHIVE_DIR):
+    """Archive file for a record of kind at epoch ts"""
+    dt = datetime.fromtimestamp(ts, timezone.utc)
+    return os.path.join(base, kind, dt.strftime('%Y-%m-%d'), f"{dt:%H}.jsonl.gz")
+
+class Archiver:
+    """Non-blocking archive writer - archive() only enqueues"""
+
+    def __init__(self, base=ARCHIVE_DIR, flush_seconds=ARCHIVE_FLUSH_SECONDS, max_pending=10000):
+        self.base = base
+        self.flush_seconds = flush_seconds
+        self.pending = queue.Queue(maxsize=max_pending)
+        self.dropped = 0
+        self.thread = None
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+
+    def start(self):
+        """Start the background writer (once)"""
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, daemon=True)
+                self.thread.start()
+                atexit.register(self.flush)
+
+    def archive(self, kind, record, ts=None):
+        """Queue a record for writing, never blocks the caller"""
+        if not ARCHIVE_ENABLED:
+            return
+        self.start()
+
+        data = to_dict(record)
+        data["_ts"] = int(ts if ts is not None else time.time())
+        try:
+            self.pending.put_nowait((kind, data))
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_seconds)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Archive Flush Error: {e}")
+
+    def flush(self):
+        """Write everything queued so far, one gzip member per partition"""
+        with self.flush_lock:
+            self._drain()
+
+    def _drain(self):
+        batches = defaultdict(list)
+        while True:
+            try:
+                kind, data = self.pending.get_nowait()
+            except queue.Empty:
+                break
+            batches[partition_path(kind, data["_ts"], self.base)].append(data)
+            if sum(len(batch) for batch in batches.values()) >= ARCHIVE_BATCH_SIZE:
+                self._write(batches)
+                batches = defaultdict(list)
+        self._write(batches)
+
+        if self.dropped:
+            logger.warning(f"🗄️  Archive kuyruğu dolu - {self.dropped} kayıt atlandı")
+            self.dropped = 0
+
+    def _write(self, batches):
+        for path, records in batches.items():
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            lines = "".join(json.dumps(record, ensure_ascii=False, default=str) + "\n" for record in records)
+            with gzip.open(path, "at", encoding="utf-8") as f:
+                f.write(lines)
+
+archiver = Archiver()
+
+def parse_time(value):
+    """Epoch from '7d' / '24h' / '30m' (relative to now) or an ISO date"""
+    match = re.fullmatch(r"(\d+)([dhm])", value)
+    if match:
+        amount, unit = int(match.group(1)), match.group(2)
+        delta = {"d": timedelta(days=amount), "h": timedelta(hours=amount), "m": timedelta(minutes=amount)}[unit]
+        return int(time.time() - delta.total_seconds())
+
+    dt = datetime.fromisoformat(value)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp())
+
+def iter_partitions(kind, since, until, base=ARCHIVE_DIR):
+    """Partition files of kind overlapping [since, until]"""
+    hour = since - since % 3600
+    while hour <= until:
+        path = partition_path(kind, hour, base)
+        if os.path.exists(path):
+            yield path
+        hour += 3600
+
+def query(kind, since, until, coin=None, importance=None, min_usd=None, base=ARCHIVE_DIR):
+    """Yield archived records of kind in [since, until] matching the filters"""
+    coin = coin.upper() if coin else None
+    importance = importance.upper() if importance else None
+
+    for path in iter_partitions(kind, since, until, base):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                if not since <= record["_ts"] <= until:
+                    continue
+                if coin and record.get("symbol") != coin and coin not in record.get("coins", []):
+                    continue
+                if importance and record.get("news_importance") != importance:
+                    continue
+                if min_usd is not None and record.get("usd_value", 0) < min_usd:
+                    continue
+                yield record
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query the alert archive")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    q = sub.add_parser("query", help="time-range / coin query")
+    q.add_argument("kind", choices=KINDS)
+    q.add_argument("--since", default="24h", help="e.g. 7d, 24h, 30m or ISO date (default 24h)")
+    q.add_argument("--until", default=None, help="ISO date (default now)")
+    q.add_argument("--coin", help="symbol, e.g. BTC")
+    q.add_argument("--importance", help="news_importance, e.g. CRITICAL")
+    q.add_argument("--min-usd", type=float, help="minimum usd_value")
+    q.add_argument("--group-by", choices=("day", "hour"), help="count and USD sum per bucket")
+    q.add_argument("--limit", type=int, default=0, help="max records to print (0 = all)")
+    q.add_argument("--dir", default=ARCHIVE_DIR, help="archive directory")
+    args = parser.parse_args(argv)
+
+    since = parse_time(args.since)
+    until = parse_time(args.until) if args.until else int(time.time())
+    records = query(args.kind, since, until, args.coin, args.importance, args.min_usd, args.dir)
+
+    if args.group_by:
+        fmt = '%Y-%m-%d' if args.group_by == "day" else '%Y-%m-%d %H:00'
+        groups = defaultdict(lambda: [0, 0.0])
+        for record in records:
+            key = datetime.fromtimestamp(record["_ts"], timezone.utc).strftime(fmt)
+            groups[key][0] += 1
+            groups[key][1] += record.get("usd_value", 0) or 0
+        for key in sorted(groups):
+            count, usd = groups[key]
+            print(f"{key}\t{count}\t${usd:,.0f}")
+        return
+
+    for i, record in enumerate(records):
+        if args.limit and i >= args.limit:
+            break
+        print(json.dumps(record, ensure_ascii=False))
+
+if __name__ == "__main__":
+    sys.exit(main())
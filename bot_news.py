@@ -1,13 +1,23 @@
+import startup
 import os
 import logging
 import requests
-import tweepy
 import json
-from datetime import datetime
 from dotenv import load_dotenv
-from apscheduler.schedulers.background import BackgroundScheduler
 import time
+import xml.etree.ElementTree as ET
+from datetime import datetime
 import hashlib
+import re
+import queue
+import threading
+from collections import deque
+from records import NewsArticle, format_epoch
+from whale_store import WhaleStore
+from archive import archiver, to_dict
+from circuit_breaker import CircuitOpenError, get_breaker, guarded_request
+from urllib.parse import urlparse
+from routing import WebhookRouter
 
 # Load environment variables
 load_dotenv()
@@ -28,6 +38,12 @@ logger = logging.getLogger(__name__)
 # In-memory sent news storage (SESSION BASED - reset on restart is OK)
 # Bu session'da atılan haberler tekrar gelmez
 sent_news_session = set()
+sent_news_lock = threading.Lock()
+
+# Articles whose analysis failed (API or parse error) - retried on the next
+# ticks instead of being lost, since their hash is already in sent_news_session
+ANALYSIS_MAX_ATTEMPTS = 3
+analysis_retry_queue = deque(maxlen=50)
 
 # RSS Feeds
 RSS_FEEDS = [
@@ -35,15 +51,45 @@ RSS_FEEDS = [
     "https://www.coindesk.com/arc/outboundfeeds/rss/",
 ]
 
+# News-to-whale correlation: observed flows for coins mentioned in an article,
+# read from the store bot_whale writes (WHALE_STORE_PATH must be shared)
+CORRELATION_WINDOW_MINUTES = int(os.getenv("CORRELATION_WINDOW_MINUTES", "60"))
+CORRELATION_IN_PROMPT = os.getenv("CORRELATION_IN_PROMPT", "false").lower() == "true"
+COIN_ALIASES = {
+    "BTC": ["bitcoin", "btc"],
+    "ETH": ["ethereum", "eth", "ether"],
+    "SOL": ["solana", "sol"],
+    "USDC": ["usdc", "usd coin"],
+    "USDT": ["tether", "usdt"],
+}
+COIN_PATTERNS = {
+    symbol: re.compile(r"\b(" + "|".join(re.escape(alias) for alias in aliases) + r")\b", re.IGNORECASE)
+    for symbol, aliases in COIN_ALIASES.items()
+}
+whale_store = WhaleStore(readonly=True)
+
+# Analyzed news fans out to every matching webhook (WEBHOOK_ROUTES_FILE),
+# or just DISCORD_WEBHOOK_URL when no routes are configured
+news_router = WebhookRouter("news", DISCORD_WEBHOOK_URL)
+
 # Twitter Keywords
 TWITTER_KEYWORDS = ["bitcoin", "ethereum", "crypto", "cryptocurrency", "blockchain", "NFT", "DeFi", "altcoin", "BTC", "ETH"]
+TWITTER_QUERY = "(" + " OR ".join(TWITTER_KEYWORDS) + ") -is:retweet lang:en"
+
+# Filtered stream when the token has access, otherwise search polling with a
+# since_id cursor so each tick only returns new tweets
+TWITTER_STREAMING = os.getenv("TWITTER_STREAMING", "true").lower() == "true"
+TWITTER_RULE_TAG = "cryptonewsaibot"
+twitter_client = None
+twitter_stream = None
+twitter_since_id = None
+tweet_queue = queue.Queue(maxsize=200)
 
 def parse_rss_feed(feed_url):
     """Parse RSS feed"""
     articles = []
     try:
-        import xml.etree.ElementTree as ET
-        response = requests.get(feed_url, timeout=10)
+        response = guarded_request(f"rss:{urlparse(feed_url).netloc}", "GET", feed_url, timeout=10)
         response.raise_for_status()
         root = ET.fromstring(response.content)
         items = root.findall('.//item') or root.findall('.//{http://www.w3.org/2005/Atom}entry')
@@ -66,20 +112,15 @@ def parse_rss_feed(feed_url):
             title = title_elem.text if title_elem is not None else ""
             description = desc_elem.text if desc_elem is not None else ""
             link = link_elem.text if link_elem is not None else ""
-            published_time = pub_date.text if pub_date is not None else datetime.now().isoformat()
+            published_time = pub_date.text if pub_date is not None else None
             
             if link_elem is not None and link_elem.get('href'):
                 link = link_elem.get('href')
             
             if title and link:
-                articles.append({
-                    "title": title,
-                    "description": description[:300] if description else "",
-                    "url": link,
-                    "source": "RSS Feed",
-                    "type": "rss",
-                    "published_at": published_time
-                })
+                articles.append(NewsArticle(title, description, link, "RSS Feed", "rss", published_time))
+    except CircuitOpenError:
+        pass
     except Exception as e:
         logger.error(f"RSS Parse Error: {e}")
     
@@ -96,162 +137,510 @@ def get_newsapi_news():
             "apiKey": NEWSAPI_KEY,
             "pageSize": 5,
         }
-        response = requests.get(url, params=params, timeout=10)
+        response = guarded_request("newsapi", "GET", url, params=params, timeout=10)
         articles = response.json().get("articles", [])
         
         formatted = []
         for article in articles:
-            formatted.append({
-                "title": article.get("title", ""),
-                "description": article.get("description", "")[:300],
-                "url": article.get("url", ""),
-                "source": article.get("source", {}).get("name", "NewsAPI"),
-                "type": "newsapi",
-                "published_at": article.get("publishedAt", datetime.now().isoformat())
-            })
+            formatted.append(NewsArticle(
+                article.get("title"),
+                article.get("description"),
+                article.get("url"),
+                (article.get("source") or {}).get("name") or "NewsAPI",
+                "newsapi",
+                article.get("publishedAt")
+            ))
         return formatted
+    except CircuitOpenError:
+        return []
     except Exception as e:
         logger.error(f"NewsAPI Error: {e}")
         return []
 
+def tweet_to_article(tweet, users):
+    """Build a NewsArticle from a tweet and its expanded users"""
+    username = getattr(users.get(tweet.author_id), 'username', None)
+    return NewsArticle(
+        f"Tweet from @{username or 'unknown'}",
+        tweet.text,
+        f"https://twitter.com/{username or 'crypto'}/status/{tweet.id}",
+        "Twitter",
+        "twitter",
+        tweet.created_at
+    )
+
+def get_twitter_client():
+    """Return the long-lived Twitter API client"""
+    global twitter_client
+    
+    if twitter_client is None:
+        # Imported on first use so a bot without Twitter never loads tweepy
+        import tweepy
+        twitter_client = tweepy.Client(bearer_token=TWITTER_BEARER_TOKEN)
+    return twitter_client
+
 def get_twitter_news():
-    """Fetch from Twitter"""
+    """Fetch from Twitter (search fallback when the filtered stream is not running)"""
+    global twitter_since_id
+    
+    if twitter_stream is not None or not TWITTER_BEARER_TOKEN:
+        # Tweets arrive through the filtered stream, or Twitter is not configured
+        return []
+    
+    breaker = get_breaker("twitter")
+    if not breaker.allow():
+        return []
+    
     try:
-        client = tweepy.Client(bearer_token=TWITTER_BEARER_TOKEN)
-        query = " OR ".join(TWITTER_KEYWORDS) + " -is:retweet lang:en"
-        
-        tweets = client.search_recent_tweets(
-            query=query,
-            max_results=10,
-            tweet_fields=['created_at', 'public_metrics'],
-            expansions=['author_id'],
-            user_fields=['username']
-        )
+        params = {
+            "query": TWITTER_QUERY,
+            "max_results": 10,
+            "tweet_fields": ['created_at', 'public_metrics'],
+            "expansions": ['author_id'],
+            "user_fields": ['username']
+        }
+        if twitter_since_id:
+            params["since_id"] = twitter_since_id
+        
+        tweets = get_twitter_client().search_recent_tweets(**params)
+        breaker.record_success()
+        
+        newest_id = (tweets.meta or {}).get("newest_id")
+        if newest_id:
+            twitter_since_id = newest_id
         
         if not tweets.data:
             return []
         
         users = {user.id: user for user in tweets.includes['users']} if tweets.includes else {}
-        formatted = []
-        
-        for tweet in tweets.data:
-            user = users.get(tweet.author_id, {})
-            formatted.append({
-                "title": f"Tweet from @{getattr(user, 'username', 'unknown')}",
-                "description": tweet.text[:300],
-                "url": f"https://twitter.com/{getattr(user, 'username', 'crypto')}/status/{tweet.id}",
-                "source": "Twitter",
-                "type": "twitter",
-                "published_at": tweet.created_at.isoformat() if tweet.created_at else datetime.now().isoformat()
-            })
-        return formatted
+        return [tweet_to_article(tweet, users) for tweet in tweets.data]
     except Exception as e:
+        breaker.record_failure(type(e).__name__)
         logger.error(f"Twitter Error: {e}")
         return []
 
+def create_tweet_stream():
+    """Filtered-stream client that pushes matching tweets into tweet_queue"""
+    import tweepy
+    
+    class CryptoTweetStream(tweepy.StreamingClient):
+        """Stops itself on 401/403 so ingestion falls back to search polling"""
+        
+        def on_response(self, response):
+            if response.data is None:
+                return
+            
+            users = {user.id: user for user in (response.includes or {}).get('users', [])}
+            article = tweet_to_article(response.data, users)
+            
+            try:
+                tweet_queue.put_nowait(article)
+            except queue.Full:
+                # Prefer fresh tweets: drop the oldest queued one
+                try:
+                    tweet_queue.get_nowait()
+                except queue.Empty:
+                    pass
+                tweet_queue.put_nowait(article)
+        
+        def on_request_error(self, status_code):
+            logger.warning(f"Twitter stream HTTP {status_code}")
+            if status_code in (401, 403):
+                # No stream access on this plan/token - don't keep retrying
+                self.disconnect()
+        
+        def on_disconnect(self):
+            global twitter_stream
+            
+            twitter_stream = None
+            logger.warning("📴 Twitter stream kapandı - search polling'e dönülüyor")
+        
+    return CryptoTweetStream(TWITTER_BEARER_TOKEN)
+
+def process_tweet_queue():
+    """Analyze streamed tweets as they arrive"""
+    while True:
+        article = tweet_queue.get()
+        try:
+            if mark_as_seen(article):
+                archive_article(article)
+                process_article(article)
+                time.sleep(2)
+        except Exception as e:
+            logger.error(f"Tweet Queue Error: {e}")
+
+def start_twitter_stream():
+    """Start filtered-stream ingestion, returns False when search polling must be used"""
+    global twitter_stream
+    
+    if not TWITTER_STREAMING or not TWITTER_BEARER_TOKEN:
+        return False
+    
+    import tweepy
+    
+    stream = create_tweet_stream()
+    try:
+        rules = stream.get_rules().data or []
+        stale = [rule.id for rule in rules if rule.tag == TWITTER_RULE_TAG and rule.value != TWITTER_QUERY]
+        if stale:
+            stream.delete_rules(stale)
+        if not any(rule.value == TWITTER_QUERY for rule in rules):
+            stream.add_rules(tweepy.StreamRule(TWITTER_QUERY, tag=TWITTER_RULE_TAG))
+    except Exception as e:
+        logger.warning(f"Twitter stream kullanılamıyor, search polling kullanılacak: {e}")
+        return False
+    
+    twitter_stream = stream
+    threading.Thread(target=process_tweet_queue, daemon=True).start()
+    stream.filter(
+        threaded=True,
+        tweet_fields=['created_at', 'public_metrics'],
+        expansions=['author_id'],
+        user_fields=['username']
+    )
+    logger.info("📡 Twitter filtered stream başlatıldı")
+    return True
+
 def create_unique_hash(title, description):
     """Create unique hash from title and description"""
     combined = f"{title}:{description}".lower().strip()
     return hashlib.md5(combined.encode()).hexdigest()
 
-def analyze_with_claude(title, description):
-    """Advanced analysis with Claude - Psychology & Market Behavior"""
-    try:
-        headers = {
-            "x-api-key": CLAUDE_API_KEY,
-            "anthropic-version": "2023-06-01",
-            "content-type": "application/json"
-        }
+# Static analysis instructions, sent as the system prompt so only the article
+# changes between calls. news_importance comes first so the streaming path can
+# stop generation early on SKIPPABLE news.
+#
+# No cache_control: this prompt is ~400 tokens and the minimum cacheable prefix
+# is 2048 tokens for Haiku (1024 for Sonnet/Opus), so the API would silently
+# ignore the breakpoint. Revisit only if the prompt grows past that threshold.
+ANALYSIS_SYSTEM_PROMPT = """Sen uzman bir kripto analisti ve pazar psikologusun. Haberin Fear & Greed, whale ve retail davranışı ve fiyat üzerindeki etkisini, haberin güvenilirliğini de dikkate alarak analiz et; önemsiz haberleri SKIPPABLE işaretle.
+
+news_importance: CRITICAL (fiyat %10+), HIGH (%5-10), MEDIUM (%2-5), LOW (<%2), SKIPPABLE (önemsiz)
+risk_level: HIGH (çok volatil/belirsiz), MEDIUM, LOW
+recommendation: BUY, SELL, WAIT, HOLD
+
+SADECE tek satır JSON döndür, başka metin yazma:
+{"news_importance":"CRITICAL|HIGH|MEDIUM|LOW|SKIPPABLE","title_tr":"Türkçe başlık","summary_tr":"<=150 kr","sentiment":"POSITIVE|NEGATIVE|NEUTRAL","market_impact":"HIGH|MEDIUM|LOW","price_movement":"ör: +3-5%","risk_level":"HIGH|MEDIUM|LOW","recommendation":"BUY|SELL|WAIT|HOLD","psychology":"<=80 kr","whale_behavior":"<=80 kr","analysis_tr":"<=100 kr","emoji":"tek emoji"}"""
+
+CLAUDE_MODEL = os.getenv("CLAUDE_MODEL", "claude-3-5-haiku-20241022")
+
+# Upper bound from the schema: ~510 characters of capped Turkish free text plus
+# ~250 of keys and enums, at ~2.5 characters per token, is ~300 tokens; 450
+# leaves 50% headroom. log_claude_usage reports observed p50/p95/max output
+# tokens every CLAUDE_USAGE_REPORT_EVERY calls - set this to about p95 + 25%.
+CLAUDE_MAX_TOKENS = int(os.getenv("CLAUDE_MAX_TOKENS", "450"))
+CLAUDE_USAGE_REPORT_EVERY = int(os.getenv("CLAUDE_USAGE_REPORT_EVERY", "50"))
+
+# Output token counts of complete (not early-skipped) replies
+observed_output_tokens = deque(maxlen=500)
+observed_replies = 0
+
+# Stream replies and stop reading as soon as the verdict is known
+CLAUDE_STREAMING = os.getenv("CLAUDE_STREAMING", "true").lower() == "true"
+
+SKIPPABLE_PATTERN = re.compile(r'"news_importance"\s*:\s*"SKIPPABLE"')
+
+def estimate_tokens(text):
+    """Rough token count for text the API never reported usage for"""
+    return max(1, round(len(text) / 3.5))
+
+def log_claude_usage(usage, elapsed, stop_reason):
+    """Log per-call token accounting and latency, and periodic output stats"""
+    global observed_replies
+    input_tokens = usage.get("input_tokens", 0)
+    if "output_tokens" in usage:
+        output_tokens = usage["output_tokens"]
+        observed_output_tokens.append(output_tokens)
+        observed_replies += 1
+    elif "output_tokens_estimate" in usage:
+        output_tokens = f"~{usage['output_tokens_estimate']}"
+    else:
+        output_tokens = "?"
+    
+    logger.info(f"💰 Tokens: in={input_tokens} out={output_tokens} | {elapsed:.2f}s ({stop_reason})")
+    
+    if stop_reason == "max_tokens":
+        logger.warning(f"⚠️  Claude yanıtı max_tokens ({CLAUDE_MAX_TOKENS}) sınırında kesildi")
+    
+    if "output_tokens" in usage and observed_replies % CLAUDE_USAGE_REPORT_EVERY == 0:
+        ordered = sorted(observed_output_tokens)
+        p50 = ordered[len(ordered) // 2]
+        p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+        logger.info(
+            f"📏 Output tokens (son {len(ordered)} yanıt): p50={p50} p95={p95} "
+            f"max={ordered[-1]} | max_tokens={CLAUDE_MAX_TOKENS}"
+        )
+
+class JSONObjectScanner:
+    """Incrementally find the end of the first JSON object in streamed text"""
+    
+    def __init__(self):
+        self.pos = 0
+        self.depth = 0
+        self.started = False
+        self.in_string = False
+        self.escaped = False
+    
+    def feed(self, text):
+        """Scan new characters of text, return end index of the object or -1"""
+        while self.pos < len(text):
+            char = text[self.pos]
+            self.pos += 1
+            
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == '\\':
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"' and self.started:
+                self.in_string = True
+            elif char == '{':
+                self.started = True
+                self.depth += 1
+            elif char == '}' and self.started:
+                self.depth -= 1
+                if self.depth == 0:
+                    return self.pos
+        return -1
+
+class AnalysisFailed(Exception):
+    """Raised when Claude analysis fails and the article should be retried"""
+
+# Allowed values per enum field; missing optional fields fall back to the default
+ANALYSIS_ENUMS = {
+    "news_importance": ({"CRITICAL", "HIGH", "MEDIUM", "LOW", "SKIPPABLE"}, None),
+    "sentiment": ({"POSITIVE", "NEGATIVE", "NEUTRAL"}, "NEUTRAL"),
+    "market_impact": ({"HIGH", "MEDIUM", "LOW"}, "MEDIUM"),
+    "risk_level": ({"HIGH", "MEDIUM", "LOW"}, "MEDIUM"),
+    "recommendation": ({"BUY", "SELL", "WAIT", "HOLD"}, "WAIT"),
+}
+
+class NewsAnalysis:
+    """Validated Claude analysis of a single article"""
+    
+    __slots__ = (
+        "news_importance", "title_tr", "summary_tr", "sentiment", "market_impact",
+        "price_movement", "risk_level", "recommendation", "psychology",
+        "whale_behavior", "analysis_tr", "emoji",
+    )
+    
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields.get(name, ""))
+    
+    @classmethod
+    def from_dict(cls, data):
+        """Build from parsed JSON, raising ValueError on invalid fields"""
+        if not isinstance(data, dict):
+            raise ValueError("analysis is not a JSON object")
         
-        prompt = f"""Sen bir uzman kripto para analisti ve pazar psikologusun.
-
-GÖREVIN:
-1. Haberin GERÇEK piyasa psikolojisine etkisini anlamak
-2. Fiyat hareketleri öncesi işaret olup olmadığını tespit etmek
-3. Sadece KAYDA DEĞER haberleri seç, önemsiz olanları göz ardı et
-4. Yatırımcı davranışını ne şekilde etkileyeceğini analiz etmek
-
-HABER:
-Başlık: {title}
-Özet: {description}
-
-ANALIZ KRİTERLERİ:
-- Fear & Greed Index etkisi nedir?
-- Whale/Büyük yatırımcıları hareket ettirir mi?
-- Retail yatırımcı paniğine neden olur mu?
-- Fiyat hareketinin büyüklüğü ne olabilir?
-- Haberin gerçekliği ne kadar kesin?
-
-ÖNEMLİLİK FİLTRESİ:
-- CRITICAL: Devasa hareket yaratabilecek (Fiyat %10+)
-- HIGH: Büyük hareket yaratabilecek (Fiyat %5-10)
-- MEDIUM: Dikkate alınması gereken (Fiyat %2-5)
-- LOW: Bilgilendirici (Fiyat <2%)
-- SKIPPABLE: Önemsiz haber
-
-RİSK SEVİYESİ:
-- HIGH: Çok yüksek volatilite ve belirsizlik
-- MEDIUM: Normal volatilite
-- LOW: Düşük volatilite
-
-ÖNERİ:
-- BUY: Satın alma sinyali
-- SELL: Satış sinyali
-- WAIT: Bekleme önerisi
-- HOLD: Tutma önerisi
-
-SADECE bu JSON formatında cevap ver:
-{{"title_tr": "Türkçe başlık", "summary_tr": "Türkçe özet (max 150 karakter)", "sentiment": "POSITIVE/NEGATIVE/NEUTRAL", "market_impact": "HIGH/MEDIUM/LOW", "news_importance": "CRITICAL/HIGH/MEDIUM/LOW/SKIPPABLE", "price_movement": "Beklenen fiyat hareketi (ör: +3-5%)", "risk_level": "HIGH/MEDIUM/LOW", "recommendation": "BUY/SELL/WAIT/HOLD", "psychology": "Pazar psikolojisi (max 80 karakter)", "whale_behavior": "Whale davranışı (max 80 karakter)", "analysis_tr": "Kısa analiz (max 100 karakter)", "emoji": "Uygun emoji"}}"""
-        
-        payload = {
-            "model": "claude-3-5-haiku-20241022",
-            "max_tokens": 800,
-            "messages": [{"role": "user", "content": prompt}]
-        }
+        fields = {}
+        for name in cls.__slots__:
+            value = data.get(name)
+            fields[name] = str(value).strip() if value is not None else ""
         
-        response = requests.post(
-            "https://api.anthropic.com/v1/messages",
-            headers=headers,
-            json=payload,
-            timeout=15
-        )
+        for name, (allowed, default) in ANALYSIS_ENUMS.items():
+            value = fields[name].upper()
+            if not value and default is not None:
+                value = default
+            if value not in allowed:
+                raise ValueError(f"invalid {name}: {fields[name]!r}")
+            fields[name] = value
         
-        if response.status_code == 200:
-            result = response.json()
-            text = result['content'][0]['text'].strip()
-            
-            logger.info(f"Claude: {text[:80]}")
+        if fields["news_importance"] != "SKIPPABLE" and not fields["title_tr"]:
+            raise ValueError("missing title_tr")
+        
+        return cls(**fields)
+
+def repair_json(text):
+    """Cheap local fixes for common JSON defects in model output"""
+    text = text.replace("```json", "").replace("```", "")
+    
+    start = text.find('{')
+    if start < 0:
+        return None
+    text = text[start:]
+    
+    scanner = JSONObjectScanner()
+    end = scanner.feed(text)
+    if end >= 0:
+        text = text[:end]
+    else:
+        # Truncated reply (e.g. max_tokens): close the open string and braces
+        if scanner.in_string:
+            text += '"'
+        text = text.rstrip().rstrip(',') + '}' * scanner.depth
+    
+    text = text.replace('“', '"').replace('”', '"')
+    text = re.sub(r',\s*([}\]])', r'\1', text)
+    return text
+
+def parse_analysis(text):
+    """Parse Claude's reply into a NewsAnalysis, repairing it if needed"""
+    start = text.find('{')
+    end = text.rfind('}') + 1
+    
+    if start >= 0 and end > start:
+        try:
+            return NewsAnalysis.from_dict(json.loads(text[start:end], strict=False))
+        except (json.JSONDecodeError, ValueError):
+            pass
+    
+    repaired = repair_json(text)
+    if repaired is None:
+        raise ValueError("JSON not found in response")
+    
+    analysis = NewsAnalysis.from_dict(json.loads(repaired, strict=False))
+    logger.info(f"🔧 JSON yanıtı onarıldı")
+    return analysis
+
+def stream_claude_text(headers, payload):
+    """Stream a Claude reply, returning (text, usage, stop_reason)
+
+    Reading stops (and the connection is closed, cancelling generation) as
+    soon as news_importance is SKIPPABLE. Once the JSON object is complete
+    further text is ignored but the stream is read to message_delta, which
+    carries the real output token count. For an early skip output_tokens is
+    never reported, so it is estimated from the text received.
+    """
+    usage = {}
+    stop_reason = None
+    text = ""
+    complete = False
+    scanner = JSONObjectScanner()
+    
+    response = requests.post(
+        "https://api.anthropic.com/v1/messages",
+        headers=headers,
+        json=dict(payload, stream=True),
+        timeout=15,
+        stream=True
+    )
+    
+    try:
+        if response.status_code != 200:
+            raise AnalysisFailed(f"Claude API error: {response.status_code}")
+        
+        # SSE responses carry no charset, requests would fall back to latin-1
+        response.encoding = "utf-8"
+        
+        for line in response.iter_lines(decode_unicode=True):
+            if not line or not line.startswith("data:"):
+                continue
             
-            if "null" in text.lower() or "skip" in text.lower():
-                logger.info(f"⏭️  Haber atlandı (önemsiz)")
-                return None
+            event = json.loads(line[5:].strip())
+            event_type = event.get("type")
             
-            try:
-                start = text.find('{')
-                end = text.rfind('}') + 1
+            if event_type == "message_start":
+                usage.update(event.get("message", {}).get("usage", {}))
+            elif event_type == "content_block_delta" and not complete:
+                text += event.get("delta", {}).get("text", "")
+                
+                if SKIPPABLE_PATTERN.search(text):
+                    stop_reason = "early_skip"
+                    # message_start's output_tokens is a placeholder, not the total
+                    usage.pop("output_tokens", None)
+                    usage["output_tokens_estimate"] = estimate_tokens(text)
+                    break
                 
-                if start >= 0 and end > start:
-                    json_str = text[start:end]
-                    analysis = json.loads(json_str)
-                    
-                    if analysis.get("news_importance") == "SKIPPABLE":
-                        logger.info(f"⏭️  Filtrelen: SKIPPABLE")
-                        return None
-                    
-                    logger.info(f"✅ {analysis.get('sentiment')} | {analysis.get('news_importance')}")
-                    return analysis
-                else:
-                    logger.error(f"JSON not found in response")
-                    return None
-            except json.JSONDecodeError as e:
-                logger.error(f"JSON Parse Error: {e}")
-                return None
+                end = scanner.feed(text)
+                if end >= 0:
+                    text = text[:end]
+                    complete = True
+            elif event_type == "message_delta":
+                usage.update(event.get("usage", {}))
+                stop_reason = event.get("delta", {}).get("stop_reason", stop_reason)
+            elif event_type == "message_stop":
+                break
+            elif event_type == "error":
+                raise AnalysisFailed(f"Claude stream error: {event.get('error', {}).get('message')}")
+    finally:
+        response.close()
+    
+    return text, usage, stop_reason
+
+def request_claude_text(headers, payload):
+    """Fetch a full (non-streamed) Claude reply, returning (text, usage, stop_reason)"""
+    response = requests.post(
+        "https://api.anthropic.com/v1/messages",
+        headers=headers,
+        json=payload,
+        timeout=15
+    )
+    
+    if response.status_code != 200:
+        raise AnalysisFailed(f"Claude API error: {response.status_code}")
+    
+    result = response.json()
+    text = "".join(block.get("text", "") for block in result.get("content") or [] if block.get("type") == "text")
+    if not text:
+        raise AnalysisFailed("Claude reply has no text content")
+    return text, result.get("usage", {}), result.get("stop_reason")
+
+def analyze_with_claude(title, description, whale_context=None):
+    """Advanced analysis with Claude - Psychology & Market Behavior
+
+    whale_context, if given, is appended to the article as observed on-chain
+    activity so whale_behavior can be grounded in real flows.
+
+    Returns a NewsAnalysis, or None for SKIPPABLE news. Raises AnalysisFailed
+    when the call or the reply is unusable so the article can be retried.
+    """
+    headers = {
+        "x-api-key": CLAUDE_API_KEY,
+        "anthropic-version": "2023-06-01",
+        "content-type": "application/json"
+    }
+    
+    prompt = f"Başlık: {title}\nÖzet: {description}"
+    if whale_context:
+        prompt += f"\nGözlenen whale akışı (son {CORRELATION_WINDOW_MINUTES} dk): {whale_context}"
+    
+    payload = {
+        "model": CLAUDE_MODEL,
+        "max_tokens": CLAUDE_MAX_TOKENS,
+        "system": ANALYSIS_SYSTEM_PROMPT,
+        "messages": [{"role": "user", "content": prompt}]
+    }
+    
+    try:
+        started = time.monotonic()
+        if CLAUDE_STREAMING:
+            text, usage, stop_reason = stream_claude_text(headers, payload)
         else:
-            logger.error(f"Claude API error: {response.status_code}")
-            return None
+            text, usage, stop_reason = request_claude_text(headers, payload)
+        elapsed = time.monotonic() - started
+    except AnalysisFailed:
+        raise
+    except requests.RequestException as e:
+        raise AnalysisFailed(f"Claude request error: {e}")
     except Exception as e:
-        logger.error(f"Analysis Error: {e}")
+        # Undecodable body, bad SSE event, unexpected reply shape
+        raise AnalysisFailed(f"Claude response error: {type(e).__name__}: {e}")
+    
+    log_claude_usage(usage, elapsed, stop_reason)
+    text = text.strip()
+    
+    logger.info(f"Claude: {text[:80]}")
+    
+    if SKIPPABLE_PATTERN.search(text):
+        logger.info(f"⏭️  Filtrelen: SKIPPABLE")
+        return None
+    
+    try:
+        analysis = parse_analysis(text)
+    except ValueError as e:
+        # json.JSONDecodeError is a ValueError subclass
+        raise AnalysisFailed(f"JSON Parse Error: {e}")
+    
+    if analysis.news_importance == "SKIPPABLE":
+        logger.info(f"⏭️  Filtrelen: SKIPPABLE")
         return None
+    
+    logger.info(f"✅ {analysis.sentiment} | {analysis.news_importance}")
+    return analysis
 
 def get_sentiment_color(sentiment):
     """Get color for sentiment"""
@@ -281,36 +670,35 @@ def get_urgency_badge(importance):
     }
     return badges.get(importance, "ℹ️ ORTA")
 
-def format_published_time(iso_time):
-    """Format published time"""
+def format_published_time(published_at):
+    """Format published time (epoch seconds)"""
     try:
-        dt = datetime.fromisoformat(iso_time.replace('Z', '+00:00'))
-        return dt.strftime('%Y-%m-%d %H:%M')
-    except:
+        return format_epoch(published_at)
+    except (TypeError, ValueError, OverflowError, OSError):
         return "Zaman bilinmiyor"
 
-def send_to_discord(news_item, analysis):
+def send_to_discord(news_item, analysis, whale_flows=None):
     """Send analyzed news to Discord"""
     try:
         if not analysis:
             return False
         
-        if analysis.get("news_importance") == "SKIPPABLE":
+        if analysis.news_importance == "SKIPPABLE":
             logger.info(f"⏭️  Gönderilmedi (önemsiz)")
             return False
         
-        title_tr = analysis.get("title_tr", "")
-        summary_tr = analysis.get("summary_tr", "")
-        sentiment = analysis.get("sentiment", "NEUTRAL")
-        market_impact = analysis.get("market_impact", "MEDIUM")
-        analysis_text = analysis.get("analysis_tr", "")
-        psychology = analysis.get("psychology", "")
-        whale_behavior = analysis.get("whale_behavior", "")
-        news_importance = analysis.get("news_importance", "MEDIUM")
-        price_movement = analysis.get("price_movement", "Bilinmiyor")
-        risk_level = analysis.get("risk_level", "MEDIUM")
-        recommendation = analysis.get("recommendation", "WAIT")
-        published_time = format_published_time(news_item.get("published_at", ""))
+        title_tr = analysis.title_tr
+        summary_tr = analysis.summary_tr
+        sentiment = analysis.sentiment
+        market_impact = analysis.market_impact
+        analysis_text = analysis.analysis_tr
+        psychology = analysis.psychology
+        whale_behavior = analysis.whale_behavior
+        news_importance = analysis.news_importance
+        price_movement = analysis.price_movement or "Bilinmiyor"
+        risk_level = analysis.risk_level
+        recommendation = analysis.recommendation
+        published_time = format_published_time(news_item.published_at)
         
         emoji_sentiment = get_emoji_for_sentiment(sentiment)
         color = get_sentiment_color(sentiment)
@@ -341,10 +729,19 @@ def send_to_discord(news_item, analysis):
             "HOLD": "🔵 TART"
         }
         
+        # Observed flows (bot_whale) shown next to Claude's whale prediction
+        whale_flow_fields = []
+        if whale_flows:
+            whale_flow_fields.append({
+                "name": f"🔗 Gözlenen Whale Akışı (son {CORRELATION_WINDOW_MINUTES} dk)",
+                "value": "\n".join(flow.summary() for flow in whale_flows.values()),
+                "inline": False
+            })
+        
         embed = {
             "title": f"{emoji_sentiment} {title_tr}",
             "description": summary_tr,
-            "url": news_item.get("url", ""),
+            "url": news_item.url,
             "color": color,
             "fields": [
                 {
@@ -387,6 +784,7 @@ def send_to_discord(news_item, analysis):
                     "value": whale_behavior if whale_behavior else "Tahmin yapılamadı",
                     "inline": False
                 },
+                *whale_flow_fields,
                 {
                     "name": "💬 Analiz",
                     "value": analysis_text if analysis_text else "Analiz yapılamadı",
@@ -394,7 +792,7 @@ def send_to_discord(news_item, analysis):
                 },
                 {
                     "name": "📌 Kaynak",
-                    "value": news_item.get("source", "Unknown"),
+                    "value": news_item.source or "Unknown",
                     "inline": True
                 },
                 {
@@ -410,18 +808,87 @@ def send_to_discord(news_item, analysis):
         
         payload = {"embeds": [embed]}
         
-        response = requests.post(DISCORD_WEBHOOK_URL, json=payload, timeout=10)
+        delivered = news_router.deliver(
+            payload,
+            importance=news_importance,
+            sentiment=sentiment,
+            coins=detect_coins(f"{news_item.title} {news_item.description}")
+        )
         
-        if response.status_code in [200, 204]:
-            logger.info(f"✅ Discord'a gönderildi: {title_tr[:40]}")
+        if delivered:
+            logger.info(f"✅ Discord'a gönderildi ({delivered} webhook): {title_tr[:40]}")
             return True
         else:
-            logger.error(f"Discord Error: {response.status_code}")
+            logger.info(f"⏭️  Eşleşen webhook yok veya gönderilemedi: {title_tr[:40]}")
             return False
     except Exception as e:
         logger.error(f"Send Error: {e}")
         return False
 
+def mark_as_seen(article):
+    """Record an article's hash, returns False if it was already processed"""
+    news_hash = create_unique_hash(article.title, article.description)
+    
+    with sent_news_lock:
+        if news_hash in sent_news_session:
+            return False
+        sent_news_session.add(news_hash)
+        return True
+
+def detect_coins(text):
+    """Symbols from COIN_ALIASES mentioned in text"""
+    return [symbol for symbol, pattern in COIN_PATTERNS.items() if pattern.search(text)]
+
+def archive_article(article):
+    """Archive a raw article with its detected coins, so --coin queries match it"""
+    archiver.archive(
+        "article",
+        dict(to_dict(article), coins=detect_coins(f"{article.title} {article.description}")),
+        article.published_at
+    )
+
+def get_whale_flows(article):
+    """Observed whale flows for the coins an article mentions"""
+    coins = detect_coins(f"{article.title} {article.description}")
+    if not coins:
+        return {}
+    
+    try:
+        return whale_store.recent_flows(coins, CORRELATION_WINDOW_MINUTES)
+    except Exception as e:
+        # Store missing or not shared with bot_whale - correlation is optional
+        logger.debug(f"Whale Store Error: {e}")
+        return {}
+
+def process_article(article, attempt=1):
+    """Analyze one article and send it, queueing it for retry on failure"""
+    logger.info(f"\n🔄 Analiz: {article.title[:50]}")
+    whale_flows = get_whale_flows(article)
+    whale_context = None
+    if whale_flows and CORRELATION_IN_PROMPT:
+        whale_context = "; ".join(flow.summary() for flow in whale_flows.values())
+    
+    try:
+        analysis = analyze_with_claude(article.title, article.description, whale_context)
+    except AnalysisFailed as e:
+        if attempt < ANALYSIS_MAX_ATTEMPTS:
+            analysis_retry_queue.append((article, attempt + 1))
+            logger.warning(f"🔁 {e} - tekrar denenecek ({attempt}/{ANALYSIS_MAX_ATTEMPTS})")
+        else:
+            logger.error(f"❌ {e} - {ANALYSIS_MAX_ATTEMPTS} denemeden sonra bırakıldı")
+        return
+    
+    if analysis:
+        archiver.archive("analysis", dict(
+            to_dict(analysis),
+            url=article.url,
+            title=article.title,
+            source=article.source,
+            coins=detect_coins(f"{article.title} {article.description}"),
+            whale_flows={symbol: to_dict(flow) for symbol, flow in whale_flows.items()}
+        ))
+        send_to_discord(article, analysis, whale_flows)
+
 def check_news():
     """Check all news sources"""
     global sent_news_session
@@ -429,6 +896,12 @@ def check_news():
     try:
         logger.info("\n🔍 Haberler kontrol ediliyor...")
         
+        # Retry previously failed analyses first
+        for _ in range(len(analysis_retry_queue)):
+            article, attempt = analysis_retry_queue.popleft()
+            process_article(article, attempt)
+            time.sleep(2)
+        
         all_articles = []
         all_articles.extend(get_newsapi_news())
         all_articles.extend(get_twitter_news())
@@ -437,24 +910,13 @@ def check_news():
         logger.info(f"📰 {len(all_articles)} haber bulundu")
         
         for article in all_articles:
-            title = article.get("title", "").strip()
-            description = article.get("description", "").strip()
-            
-            # Create unique hash
-            news_hash = create_unique_hash(title, description)
-            
-            if news_hash not in sent_news_session:
-                sent_news_session.add(news_hash)
-                
-                logger.info(f"\n🔄 Analiz: {title[:50]}")
-                analysis = analyze_with_claude(title, description)
-                
-                if analysis:
-                    send_to_discord(article, analysis)
-                
+            if mark_as_seen(article):
+                archive_article(article)
+                process_article(article)
                 time.sleep(2)
         
         logger.info(f"\n✅ Kontrol tamamlandı (Bu session'da {len(sent_news_session)} haber işlendi)\n")
+        startup.mark(logger, "first check complete")
     except Exception as e:
         logger.error(f"Check Error: {e}")
 
@@ -466,7 +928,9 @@ def parse_rss_feed_all():
     return articles
 
 def start_scheduler():
-    """Start scheduler"""
+    """Start scheduler - the first check runs immediately, then every 30s"""
+    from apscheduler.schedulers.background import BackgroundScheduler
+    
     scheduler = BackgroundScheduler()
     
     scheduler.add_job(
@@ -474,7 +938,8 @@ def start_scheduler():
         'interval',
         seconds=30,
         id='check_news_job',
-        replace_existing=True
+        replace_existing=True,
+        next_run_time=datetime.now()
     )
     
     scheduler.start()
@@ -484,8 +949,10 @@ def start_scheduler():
 
 if __name__ == "__main__":
     logger.info("\n🤖 KRİPTO HABER ANALIZ BOTU v3 Başlatılıyor...\n")
+    startup.mark(logger, "imports loaded")
     
     scheduler = start_scheduler()
+    start_twitter_stream()
     
     try:
         while True:
@@ -1,12 +1,17 @@
+import startup
 import os
 import logging
-import requests
 import json
-from datetime import datetime, timedelta
 from dotenv import load_dotenv
-from apscheduler.schedulers.background import BackgroundScheduler
 import time
+from datetime import datetime
 import hashlib
+from records import WhaleTransfer, format_epoch
+from flows import FlowAggregator, EXCHANGE_ADDRESSES
+from whale_store import WhaleStore
+from archive import archiver
+from circuit_breaker import CircuitOpenError, guarded_request
+from routing import WebhookRouter
 
 # Load environment variables
 load_dotenv()
@@ -24,6 +29,33 @@ logger = logging.getLogger(__name__)
 # In-memory sent whale alerts storage (SESSION BASED)
 sent_whale_alerts_session = set()
 
+# Transfers from this size up are fetched and fed to the flow aggregator;
+# individual alerts still use each coin's threshold in TOP_COINS
+MIN_TRACKED_USD = int(os.getenv("WHALE_MIN_TRACKED_USD", "100000"))
+
+# Optional JSON file {"address": "Exchange"} extending the known exchange wallets
+EXCHANGE_LABELS_FILE = os.getenv("EXCHANGE_LABELS_FILE")
+
+def load_exchange_addresses():
+    """Known exchange wallets, merged with EXCHANGE_LABELS_FILE if set"""
+    addresses = dict(EXCHANGE_ADDRESSES)
+    if EXCHANGE_LABELS_FILE:
+        try:
+            with open(EXCHANGE_LABELS_FILE) as f:
+                addresses.update(json.load(f))
+        except Exception as e:
+            logger.error(f"Exchange labels load error: {e}")
+    return addresses
+
+flow_aggregator = FlowAggregator(exchanges=load_exchange_addresses())
+
+# Shared with bot_news for news-to-whale correlation
+whale_store = WhaleStore()
+
+# Alerts fan out to every matching webhook (WEBHOOK_ROUTES_FILE), or just
+# WHALE_DISCORD_WEBHOOK_URL when no routes are configured
+whale_router = WebhookRouter("whale", WHALE_DISCORD_WEBHOOK_URL)
+
 # Top coins tracking
 TOP_COINS = {
     "BTC": {"name": "Bitcoin", "threshold": 500000},
@@ -48,17 +80,56 @@ TOP_COINS = {
     "TAO": {"name": "Bittensor", "threshold": 500000},
 }
 
+# Solana JSON-RPC ingestion - walks confirmed blocks after a slot cursor in
+# batched getBlock calls so every block is read exactly once.
+#
+# Mainnet produces ~150 blocks a minute and getBlock with account keys is
+# several MB per block; the public endpoint cannot sustain that. Each tick
+# therefore reads at most SOLANA_MAX_BLOCKS_PER_TICK blocks and stops after
+# SOLANA_TICK_BUDGET_SECONDS so it never overruns the 60s job interval. On the
+# public endpoint the cursor falls behind; past SOLANA_MAX_LAG_SLOTS it jumps
+# to the tip and the skipped slot range is logged as a gap. Point
+# SOLANA_RPC_URL at a dedicated RPC node for gap-free coverage.
+SOLANA_RPC_URL = os.getenv("SOLANA_RPC_URL", "https://api.mainnet-beta.solana.com")
+SOLANA_BATCH_SIZE = int(os.getenv("SOLANA_BATCH_SIZE", "5"))
+SOLANA_MAX_BLOCKS_PER_TICK = int(os.getenv("SOLANA_MAX_BLOCKS_PER_TICK", "40"))
+SOLANA_TICK_BUDGET_SECONDS = int(os.getenv("SOLANA_TICK_BUDGET_SECONDS", "35"))
+SOLANA_MAX_LAG_SLOTS = int(os.getenv("SOLANA_MAX_LAG_SLOTS", "9000"))
+SOLANA_BLOCK_CONFIG = {
+    "encoding": "jsonParsed",
+    "transactionDetails": "accounts",
+    "rewards": False,
+    "maxSupportedTransactionVersion": 0,
+    "commitment": "confirmed",
+}
+# Slot skipped / missing in long-term storage - nothing to read there
+SOLANA_SKIPPED_SLOT_ERRORS = {-32007, -32009}
+SOLANA_TOKEN_MINTS = {
+    "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v": ("USDC", "USD Coin"),
+    "Es9vMFrzaCERmJfrF4H2FYD4KCoNkY11McCe8BenwNYB": ("USDT", "Tether"),
+}
+SOLANA_STABLECOIN_PRICE = 1.0
+LAMPORTS_PER_SOL = 1_000_000_000
+last_solana_slot = None
+
+# Last good CoinGecko price per coin id, used while CoinGecko is unavailable
+last_coin_prices = {}
+
 def get_coin_price(coin_id):
-    """Get coin price from CoinGecko (100% FREE)"""
+    """Get coin price from CoinGecko (100% FREE), last known price while it is down"""
     try:
         url = f"https://api.coingecko.com/api/v3/simple/price?ids={coin_id}&vs_currencies=usd"
-        response = requests.get(url, timeout=5)
+        response = guarded_request("coingecko", "GET", url, timeout=5)
         data = response.json()
         price = data.get(coin_id, {}).get("usd", 0)
-        return price if price > 0 else 1
+        if price > 0:
+            last_coin_prices[coin_id] = price
+            return price
+    except CircuitOpenError:
+        pass
     except Exception as e:
         logger.error(f"CoinGecko Price Error ({coin_id}): {e}")
-        return 1
+    return last_coin_prices.get(coin_id, 1)
 
 def get_bitcoin_large_transfers():
     """Get large BTC transfers from Blockchain.com (100% FREE - No API key)"""
@@ -67,7 +138,7 @@ def get_bitcoin_large_transfers():
         
         # blockchain.com - free API, no key needed
         url = "https://blockchain.info/unconfirmed/btc"
-        response = requests.get(url, timeout=10)
+        response = guarded_request("blockchain.com", "GET", url, timeout=10)
         
         if response.status_code != 200:
             logger.warning("Blockchain.com API unavailable")
@@ -94,23 +165,16 @@ def get_bitcoin_large_transfers():
                 amount_btc = amount_satoshi / 100000000
                 usd_value = amount_btc * btc_price
                 
-                # Filter for $500K+
-                if usd_value >= 500000:
+                # Keep everything the flow aggregator tracks
+                if usd_value >= MIN_TRACKED_USD:
                     from_addr = largest_input.get("prev_out", {}).get("addr", "Unknown")
                     to_addr = largest_output.get("addr", "Unknown")
                     
-                    transfers.append({
-                        "symbol": "BTC",
-                        "coin_name": "Bitcoin",
-                        "from": from_addr,
-                        "to": to_addr,
-                        "amount": amount_btc,
-                        "usd_value": usd_value,
-                        "hash": tx.get("hash", ""),
-                        "chain": "Bitcoin",
-                        "timestamp": datetime.fromtimestamp(tx.get("time", 0)).isoformat(),
-                        "explorer": "https://www.blockchain.com/btc/tx/"
-                    })
+                    transfers.append(WhaleTransfer(
+                        "BTC", "Bitcoin", from_addr, to_addr, amount_btc, usd_value,
+                        tx.get("hash", ""), "Bitcoin", tx.get("time"),
+                        "https://www.blockchain.com/btc/tx/"
+                    ))
             except Exception as e:
                 logger.debug(f"BTC TX Parse Error: {e}")
                 continue
@@ -119,6 +183,8 @@ def get_bitcoin_large_transfers():
             logger.info(f"🐋 {len(transfers)} BTC whale transfer bulundu")
         return transfers
         
+    except CircuitOpenError:
+        return []
     except Exception as e:
         logger.error(f"Bitcoin API Error: {e}")
         return []
@@ -130,7 +196,7 @@ def get_ethereum_large_transfers():
         
         # Blockscout - free, no key needed
         url = "https://eth.blockscout.com/api/v2/transactions?sort=desc"
-        response = requests.get(url, timeout=10)
+        response = guarded_request("blockscout", "GET", url, timeout=10)
         
         if response.status_code != 200:
             logger.warning("Blockscout API unavailable")
@@ -150,20 +216,15 @@ def get_ethereum_large_transfers():
                 value_eth = value_wei / 1e18
                 usd_value = value_eth * eth_price
                 
-                # Filter for $500K+
-                if usd_value >= 500000:
-                    transfers.append({
-                        "symbol": "ETH",
-                        "coin_name": "Ethereum",
-                        "from": tx.get("from", {}).get("hash", "Unknown"),
-                        "to": tx.get("to", {}).get("hash", "Unknown"),
-                        "amount": value_eth,
-                        "usd_value": usd_value,
-                        "hash": tx.get("hash", ""),
-                        "chain": "Ethereum",
-                        "timestamp": tx.get("timestamp", ""),
-                        "explorer": "https://etherscan.io/tx/"
-                    })
+                # Keep everything the flow aggregator tracks
+                if usd_value >= MIN_TRACKED_USD:
+                    transfers.append(WhaleTransfer(
+                        "ETH", "Ethereum",
+                        (tx.get("from") or {}).get("hash"),
+                        (tx.get("to") or {}).get("hash"),
+                        value_eth, usd_value, tx.get("hash", ""), "Ethereum",
+                        tx.get("timestamp"), "https://etherscan.io/tx/"
+                    ))
             except Exception as e:
                 logger.debug(f"ETH TX Parse Error: {e}")
                 continue
@@ -172,54 +233,175 @@ def get_ethereum_large_transfers():
             logger.info(f"🐋 {len(transfers)} ETH whale transfer bulundu")
         return transfers
         
+    except CircuitOpenError:
+        return []
     except Exception as e:
         logger.error(f"Ethereum API Error: {e}")
         return []
 
+def solana_rpc_batch(calls):
+    """Send several JSON-RPC calls in one HTTP request, results in call order
+
+    Each result is either the call's result or {"error": {...}}.
+    """
+    payload = [
+        {"jsonrpc": "2.0", "id": i, "method": method, "params": params}
+        for i, (method, params) in enumerate(calls)
+    ]
+    response = guarded_request("solana-rpc", "POST", SOLANA_RPC_URL, json=payload, timeout=15)
+    response.raise_for_status()
+    
+    by_id = {item.get("id"): item for item in response.json()}
+    results = []
+    for i in range(len(calls)):
+        item = by_id.get(i, {"error": {"code": None, "message": "missing response"}})
+        results.append({"error": item["error"]} if "error" in item else item.get("result"))
+    return results
+
+def is_rpc_error(result):
+    """Check whether a batched result is a JSON-RPC error"""
+    return isinstance(result, dict) and "error" in result
+
+def decode_solana_transaction(tx, block_time, sol_price):
+    """Decode native SOL and tracked SPL token transfers from balance changes"""
+    meta = tx.get("meta") or {}
+    if meta.get("err") is not None:
+        return []
+    
+    transaction = tx.get("transaction") or {}
+    signature = (transaction.get("signatures") or [""])[0]
+    keys = [key.get("pubkey") if isinstance(key, dict) else key for key in transaction.get("accountKeys", [])]
+    transfers = []
+    
+    # Native SOL - balances are in lamports
+    deltas = [post - pre for pre, post in zip(meta.get("preBalances", []), meta.get("postBalances", []))]
+    if deltas and max(deltas) > 0:
+        to_index = deltas.index(max(deltas))
+        from_index = deltas.index(min(deltas))
+        amount = deltas[to_index] / LAMPORTS_PER_SOL
+        usd_value = amount * sol_price
+        
+        if usd_value >= MIN_TRACKED_USD:
+            transfers.append(WhaleTransfer(
+                "SOL", "Solana",
+                keys[from_index] if from_index < len(keys) else None,
+                keys[to_index] if to_index < len(keys) else None,
+                amount, usd_value, signature, "Solana", block_time,
+                "https://solscan.io/tx/"
+            ))
+    
+    # SPL tokens - raw integer amounts scaled by each mint's decimals
+    token_deltas = {}
+    for sign, balances in ((-1, meta.get("preTokenBalances") or []), (1, meta.get("postTokenBalances") or [])):
+        for balance in balances:
+            mint = balance.get("mint")
+            if mint not in SOLANA_TOKEN_MINTS:
+                continue
+            ui_amount = balance.get("uiTokenAmount") or {}
+            key = (mint, balance.get("accountIndex"))
+            raw, owner, decimals = token_deltas.get(key, (0, None, 0))
+            token_deltas[key] = (
+                raw + sign * int(ui_amount.get("amount", "0")),
+                balance.get("owner") or owner,
+                ui_amount.get("decimals", decimals)
+            )
+    
+    for mint, (symbol, coin_name) in SOLANA_TOKEN_MINTS.items():
+        changes = [value for (m, _), value in token_deltas.items() if m == mint]
+        if not changes:
+            continue
+        
+        received = max(changes, key=lambda change: change[0])
+        sent = min(changes, key=lambda change: change[0])
+        if received[0] <= 0:
+            continue
+        
+        amount = received[0] / (10 ** received[2])
+        usd_value = amount * SOLANA_STABLECOIN_PRICE
+        
+        if usd_value >= MIN_TRACKED_USD:
+            transfers.append(WhaleTransfer(
+                symbol, coin_name, sent[1], received[1], amount, usd_value,
+                signature, "Solana", block_time, "https://solscan.io/tx/"
+            ))
+    
+    return transfers
+
 def get_solana_large_transfers():
-    """Get large SOL transfers from Solscan (Free API)"""
+    """Get large SOL/USDC/USDT transfers from Solana JSON-RPC (blocks after the slot cursor)"""
+    global last_solana_slot
+    
     try:
         logger.info("🌞 Solana large transfers kontrol ediliyor...")
         
-        # Solscan public API - no key needed
-        url = "https://api.solscan.io/api/v2/transfer?fromAddress=&toAddress=&limit=50"
-        response = requests.get(url, timeout=10)
+        if last_solana_slot is None:
+            current_slot = solana_rpc_batch([("getSlot", [{"commitment": "confirmed"}])])[0]
+            if is_rpc_error(current_slot):
+                logger.warning(f"Solana RPC unavailable: {current_slot['error']}")
+                return []
+            # First tick: start from the tip instead of replaying history
+            last_solana_slot = current_slot - 1
+        
+        current_slot, slots = solana_rpc_batch([
+            ("getSlot", [{"commitment": "confirmed"}]),
+            ("getBlocksWithLimit", [last_solana_slot + 1, SOLANA_MAX_BLOCKS_PER_TICK, {"commitment": "confirmed"}]),
+        ])
+        if is_rpc_error(current_slot) or is_rpc_error(slots):
+            logger.warning("Solana RPC unavailable")
+            return []
         
-        if response.status_code != 200:
-            logger.warning("Solscan API unavailable")
+        if current_slot - last_solana_slot > SOLANA_MAX_LAG_SLOTS:
+            logger.warning(
+                f"⚠️  Solana cursor {current_slot - last_solana_slot} slot geride - tip'e atlanıyor, "
+                f"okunmayan aralık: {last_solana_slot + 1}-{current_slot - 1}"
+            )
+            last_solana_slot = current_slot - 1
             return []
         
-        data = response.json()
         transfers = []
         sol_price = get_coin_price("solana")
+        deadline = time.monotonic() + SOLANA_TICK_BUDGET_SECONDS
         
-        for tx in data.get("result", {}).get("data", [])[:50]:
-            try:
-                amount = float(tx.get("amount", 0))
-                usd_value = amount * sol_price
+        for i in range(0, len(slots), SOLANA_BATCH_SIZE):
+            if time.monotonic() >= deadline:
+                logger.info(f"🌞 Solana tick süresi ({SOLANA_TICK_BUDGET_SECONDS}s) doldu, slot {last_solana_slot}'de duruldu")
+                break
+            
+            batch = slots[i:i + SOLANA_BATCH_SIZE]
+            blocks = solana_rpc_batch([("getBlock", [slot, SOLANA_BLOCK_CONFIG]) for slot in batch])
+            stalled = False
+            
+            for slot, block in zip(batch, blocks):
+                if is_rpc_error(block):
+                    if block["error"].get("code") in SOLANA_SKIPPED_SLOT_ERRORS:
+                        last_solana_slot = slot
+                        continue
+                    # Not available yet - keep the cursor here and retry next tick
+                    logger.debug(f"SOL block {slot} error: {block['error']}")
+                    stalled = True
+                    break
                 
-                # Filter for $500K+
-                if usd_value >= 500000:
-                    transfers.append({
-                        "symbol": "SOL",
-                        "coin_name": "Solana",
-                        "from": tx.get("from", "Unknown"),
-                        "to": tx.get("to", "Unknown"),
-                        "amount": amount,
-                        "usd_value": usd_value,
-                        "hash": tx.get("signature", ""),
-                        "chain": "Solana",
-                        "timestamp": datetime.fromtimestamp(tx.get("blockTime", 0)).isoformat(),
-                        "explorer": "https://solscan.io/tx/"
-                    })
-            except Exception as e:
-                logger.debug(f"SOL TX Parse Error: {e}")
-                continue
+                if block:
+                    for tx in block.get("transactions", []):
+                        try:
+                            transfers.extend(decode_solana_transaction(tx, block.get("blockTime"), sol_price))
+                        except Exception as e:
+                            logger.debug(f"SOL TX Parse Error: {e}")
+                last_solana_slot = slot
+            
+            if stalled:
+                break
+        
+        lag = current_slot - last_solana_slot
+        if lag > SOLANA_MAX_BLOCKS_PER_TICK:
+            logger.info(f"🌞 Solana cursor {lag} slot geride, sonraki tick'te devam edilecek")
         
         if transfers:
-            logger.info(f"🐋 {len(transfers)} SOL whale transfer bulundu")
+            logger.info(f"🐋 {len(transfers)} Solana whale transfer bulundu")
         return transfers
         
+    except CircuitOpenError:
+        return []
     except Exception as e:
         logger.error(f"Solana API Error: {e}")
         return []
@@ -227,7 +409,7 @@ def get_solana_large_transfers():
 def get_multi_chain_transfers():
     """Get large transfers from multiple chains"""
     try:
-        logger.info("\n🐋 Multi-Chain Whale Transfers kontrol ediliyor ($500K+ filtresi)...")
+        logger.info(f"\n🐋 Multi-Chain Whale Transfers kontrol ediliyor (${MIN_TRACKED_USD:,}+ takip)...")
         
         all_transfers = []
         
@@ -247,7 +429,7 @@ def get_multi_chain_transfers():
         if total > 0:
             logger.info(f"🐋 TOPLAM {total} whale transfer bulundu\n")
         else:
-            logger.info("📡 Whale transfer bulunamadı (şimdilik $500K+ transfer yok)\n")
+            logger.info(f"📡 Whale transfer bulunamadı (şimdilik ${MIN_TRACKED_USD:,}+ transfer yok)\n")
         
         return all_transfers
         
@@ -272,16 +454,16 @@ def format_address(address, chain="bitcoin"):
 def send_whale_alert_to_discord(transfer):
     """Send whale transfer to Discord"""
     try:
-        symbol = transfer.get("symbol", "")
-        coin_name = transfer.get("coin_name", "")
-        amount = transfer.get("amount", 0)
-        usd_value = transfer.get("usd_value", 0)
-        tx_hash = transfer.get("hash", "")
-        chain = transfer.get("chain", "")
-        from_addr = transfer.get("from", "Unknown")
-        to_addr = transfer.get("to", "Unknown")
-        timestamp = transfer.get("timestamp", "")
-        explorer_base = transfer.get("explorer", "#")
+        symbol = transfer.symbol
+        coin_name = transfer.coin_name
+        amount = transfer.amount
+        usd_value = transfer.usd_value
+        tx_hash = transfer.hash
+        chain = transfer.chain
+        from_addr = transfer.from_addr
+        to_addr = transfer.to_addr
+        timestamp = format_epoch(transfer.timestamp, '%Y-%m-%d %H:%M:%S UTC')
+        explorer_base = transfer.explorer
         
         # Create blockchain explorer link
         explorer_url = f"{explorer_base}{tx_hash}"
@@ -345,13 +527,71 @@ def send_whale_alert_to_discord(transfer):
         
         payload = {"embeds": [embed]}
         
-        response = requests.post(WHALE_DISCORD_WEBHOOK_URL, json=payload, timeout=10)
+        delivered = whale_router.deliver(payload, kind="transfer", coins=[symbol], usd=usd_value)
+        
+        if delivered:
+            logger.info(f"✅ Whale Alert gönderildi ({delivered} webhook): {symbol} - ${usd_value:,.0f}")
+            return True
+        else:
+            return False
+            
+    except Exception as e:
+        logger.error(f"Discord Send Error: {e}")
+        return False
+
+def send_flow_alert_to_discord(alert):
+    """Send rolling net-flow alert to Discord"""
+    try:
+        direction = "📥 Net Giriş" if alert.net_usd > 0 else "📤 Net Çıkış"
+        if alert.kind == "exchange":
+            title = f"🏦 {alert.key} {direction} - {alert.window}"
+            subject = alert.key
+        else:
+            title = f"🐋 Whale {direction} - {alert.window}"
+            subject = f"`{format_address(alert.key)}`"
+        
+        embed = {
+            "title": title,
+            "description": f"**Toplu akış eşiği aşıldı** (${alert.threshold:,.0f})",
+            "color": 0x00CC66 if alert.net_usd > 0 else 0xCC3300,
+            "fields": [
+                {
+                    "name": "🏷️ Adres / Borsa",
+                    "value": subject,
+                    "inline": False
+                },
+                {
+                    "name": "💵 Net Akış",
+                    "value": f"`${alert.net_usd:+,.0f}`",
+                    "inline": True
+                },
+                {
+                    "name": "⏱️ Pencere",
+                    "value": f"`{alert.window}`",
+                    "inline": True
+                },
+                {
+                    "name": "🪙 Coinler",
+                    "value": ", ".join(alert.symbols),
+                    "inline": True
+                }
+            ],
+            "footer": {
+                "text": "🔓 100% Free On-Chain Whale Alert Tracker v4.2 (Flow)"
+            }
+        }
+        
+        delivered = whale_router.deliver(
+            {"embeds": [embed]},
+            kind="flow",
+            coins=alert.symbols,
+            usd=abs(alert.net_usd)
+        )
         
-        if response.status_code in [200, 204]:
-            logger.info(f"✅ Whale Alert gönderildi: {symbol} - ${usd_value:,.0f}")
+        if delivered:
+            logger.info(f"✅ Flow Alert gönderildi ({delivered} webhook): {alert}")
             return True
         else:
-            logger.error(f"Discord Error: {response.status_code}")
             return False
             
     except Exception as e:
@@ -367,33 +607,45 @@ def check_whale_alerts():
         
         if not transfers:
             logger.info("⏭️  Whale alert bulunmadı\n")
+            startup.mark(logger, "first check complete")
             return
         
+        try:
+            whale_store.record(transfers, flow_aggregator.exchanges)
+        except Exception as e:
+            logger.error(f"Whale Store Error: {e}")
+        
         for transfer in transfers:
             # Create unique hash
-            tx_hash = transfer.get("hash", f"{transfer.get('symbol')}_{time.time()}")
-            alert_hash = create_unique_hash(
-                tx_hash,
-                transfer.get("symbol", ""),
-                transfer.get("amount", 0)
-            )
+            tx_hash = transfer.hash or f"{transfer.symbol}_{time.time()}"
+            alert_hash = create_unique_hash(tx_hash, transfer.symbol, transfer.amount)
             
             # Check if already sent in this session
             if alert_hash not in sent_whale_alerts_session:
                 sent_whale_alerts_session.add(alert_hash)
+                archiver.archive("transfer", transfer, transfer.timestamp)
                 
-                logger.info(f"\n🔔 Yeni Whale Transfer: {transfer.get('symbol')} - ${transfer.get('usd_value', 0):,.0f}")
-                send_whale_alert_to_discord(transfer)
+                for flow_alert in flow_aggregator.add(transfer):
+                    logger.info(f"\n🌊 Flow eşiği aşıldı: {flow_alert}")
+                    send_flow_alert_to_discord(flow_alert)
+                    time.sleep(1)
                 
-                time.sleep(1)
+                threshold = TOP_COINS.get(transfer.symbol, {}).get("threshold", 500000)
+                if transfer.usd_value >= threshold:
+                    logger.info(f"\n🔔 Yeni Whale Transfer: {transfer.symbol} - ${transfer.usd_value:,.0f}")
+                    send_whale_alert_to_discord(transfer)
+                    time.sleep(1)
         
         logger.info(f"\n✅ Whale Alert kontrol tamamlandı (Bu session'da {len(sent_whale_alerts_session)} alert işlendi)\n")
+        startup.mark(logger, "first check complete")
         
     except Exception as e:
         logger.error(f"Check Whale Error: {e}")
 
 def start_scheduler():
-    """Start scheduler"""
+    """Start scheduler - the first check runs immediately, then every minute"""
+    from apscheduler.schedulers.background import BackgroundScheduler
+    
     scheduler = BackgroundScheduler()
     
     # Check every 1 minute
@@ -402,7 +654,10 @@ def start_scheduler():
         'interval',
         seconds=60,
         id='check_whale_job',
-        replace_existing=True
+        replace_existing=True,
+        next_run_time=datetime.now(),
+        max_instances=1,
+        coalesce=True
     )
     
     scheduler.start()
@@ -413,9 +668,10 @@ def start_scheduler():
 
 if __name__ == "__main__":
     logger.info("\n🐋 ON-CHAIN WHALE ALERT TRACKER BOTU v4.2 Başlatılıyor ($500K+ Threshold)...\n")
+    startup.mark(logger, "imports loaded")
     
-    if not WHALE_DISCORD_WEBHOOK_URL:
-        logger.error("❌ WHALE_DISCORD_WEBHOOK_URL variable'ı ayarlanmamış!")
+    if not whale_router.routes:
+        logger.error("❌ WHALE_DISCORD_WEBHOOK_URL variable'ı veya WEBHOOK_ROUTES_FILE ayarlanmamış!")
         exit(1)
     
     scheduler = start_scheduler()
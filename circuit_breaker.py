@@ -0,0 +1,118 @@
+"""Per-upstream circuit breakers shared by the news and whale fetchers
+
+A breaker trips when the recent error rate is too high, then rejects calls
+instantly during an exponentially growing cool-down. After the cool-down a
+single half-open probe decides whether the upstream is back.
+"""
+import logging
+import threading
+import time
+from collections import deque
+
+import requests
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+logger = logging.getLogger(__name__)
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit is open"""
+
+class CircuitBreaker:
+    """Error-rate circuit breaker with half-open probing and exponential cool-down"""
+
+    def __init__(self, name, window=10, failure_rate=0.5, min_calls=3, base_cooldown=30, max_cooldown=900):
+        self.name = name
+        self.results = deque(maxlen=window)
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.base_cooldown = base_cooldown
+        self.max_cooldown = max_cooldown
+        self.state = CLOSED
+        self.trips = 0
+        self.open_until = 0.0
+        self.probing = False
+        self.lock = threading.Lock()
+
+    def allow(self):
+        """Whether a call may go through now"""
+        with self.lock:
+            if self.state == CLOSED:
+                return True
+
+            if self.state == OPEN:
+                if time.monotonic() < self.open_until:
+                    return False
+                self.state = HALF_OPEN
+                self.probing = False
+                logger.info(f"🟡 {self.name} devresi yarı açık - deneme isteği")
+
+            # Half-open: let exactly one probe through
+            if self.probing:
+                return False
+            self.probing = True
+            return True
+
+    def record_success(self):
+        with self.lock:
+            self.results.append(True)
+            if self.state != CLOSED:
+                logger.info(f"🟢 {self.name} tekrar erişilebilir - devre kapandı")
+                self.state = CLOSED
+                self.trips = 0
+                self.results.clear()
+
+    def record_failure(self, reason=""):
+        with self.lock:
+            self.results.append(False)
+
+            if self.state == HALF_OPEN:
+                self._trip(reason)
+                return
+
+            failures = self.results.count(False)
+            if len(self.results) >= self.min_calls and failures / len(self.results) >= self.failure_rate:
+                self._trip(reason)
+
+    def _trip(self, reason):
+        self.trips += 1
+        cooldown = min(self.base_cooldown * 2 ** (self.trips - 1), self.max_cooldown)
+        self.state = OPEN
+        self.open_until = time.monotonic() + cooldown
+        self.probing = False
+        logger.warning(f"🔴 {self.name} devresi açıldı ({reason}) - {cooldown}s bekleniyor")
+
+breakers = {}
+breakers_lock = threading.Lock()
+
+def get_breaker(name):
+    """Shared breaker for an upstream, created on first use"""
+    with breakers_lock:
+        if name not in breakers:
+            breakers[name] = CircuitBreaker(name)
+        return breakers[name]
+
+def guarded_request(name, method, url, healthy_statuses=(), **kwargs):
+    """requests.request through the named breaker
+
+    Raises CircuitOpenError without touching the network while the circuit is
+    open. Connection errors, timeouts and HTTP 4xx/5xx count as failures,
+    except healthy_statuses (e.g. 429, which the caller handles by backing off).
+    """
+    breaker = get_breaker(name)
+    if not breaker.allow():
+        raise CircuitOpenError(name)
+
+    try:
+        response = requests.request(method, url, **kwargs)
+    except Exception as e:
+        breaker.record_failure(type(e).__name__)
+        raise
+
+    if response.status_code >= 400 and response.status_code not in healthy_statuses:
+        breaker.record_failure(f"HTTP {response.status_code}")
+    else:
+        breaker.record_success()
+    return response
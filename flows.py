@@ -0,0 +1,153 @@
+"""Rolling whale flow aggregation over the transfer stream"""
+from array import array
+from collections import OrderedDict
+
+# Window name -> (length in seconds, net flow USD threshold)
+FLOW_WINDOWS = {
+    "1m": (60, 2_000_000),
+    "15m": (900, 5_000_000),
+    "1h": (3600, 10_000_000),
+}
+
+# Buckets per window - each update touches one bucket, expiry is amortized O(1)
+FLOW_BUCKETS = 60
+
+# Known exchange wallets (address -> exchange); extend via EXCHANGE_LABELS_FILE
+EXCHANGE_ADDRESSES = {
+    "0x28c6c06298d514db089934071355e5743bf21d60": "Binance",
+    "0x21a31ee1afc51d94c2efccaa2092ad1028285549": "Binance",
+    "0x71660c4005ba85c37ccec55d0c4493e66fe775d3": "Coinbase",
+    "0xa9d1e08c7793af67e9d92fe308d5697fb81d3e43": "Coinbase",
+    "34xp4vrocgjym3xr7ycvpfhocnxv4twseo": "Binance",
+}
+
+class RollingSum:
+    """Sliding-window sum kept in a fixed-size ring of time buckets"""
+
+    __slots__ = ("bucket_seconds", "sums", "counts", "epochs", "head", "total", "count")
+
+    def __init__(self, window_seconds, buckets=FLOW_BUCKETS):
+        self.bucket_seconds = max(1, window_seconds // buckets)
+        self.sums = array('d', [0.0] * buckets)
+        self.counts = array('l', [0] * buckets)
+        self.epochs = array('q', [-1] * buckets)
+        self.head = None
+        self.total = 0.0
+        self.count = 0
+
+    def _advance(self, bucket):
+        """Move the window head forward, clearing buckets that fell out"""
+        size = len(self.sums)
+        if self.head is None:
+            self.head = bucket - size
+        if bucket <= self.head:
+            return
+
+        for b in range(max(self.head + 1, bucket - size + 1), bucket + 1):
+            i = b % size
+            self.total -= self.sums[i]
+            self.count -= self.counts[i]
+            self.sums[i] = 0.0
+            self.counts[i] = 0
+            self.epochs[i] = b
+        self.head = bucket
+
+    def add(self, timestamp, value):
+        """Add value at timestamp (late events land in their own bucket if still in range)"""
+        bucket = int(timestamp // self.bucket_seconds)
+        self._advance(bucket)
+
+        i = bucket % len(self.sums)
+        if self.epochs[i] != bucket:
+            # Older than the window
+            return
+        self.sums[i] += value
+        self.counts[i] += 1
+        self.total += value
+        self.count += 1
+
+    def value(self, now):
+        """Sum over the window ending at now"""
+        self._advance(int(now // self.bucket_seconds))
+        return self.total
+
+class FlowAlert:
+    """Net flow for an address or exchange crossing a window threshold"""
+
+    __slots__ = ("kind", "key", "window", "net_usd", "threshold", "symbols")
+
+    def __init__(self, kind, key, window, net_usd, threshold, symbols):
+        self.kind = kind
+        self.key = key
+        self.window = window
+        self.net_usd = net_usd
+        self.threshold = threshold
+        self.symbols = symbols
+
+    def __repr__(self):
+        return f"FlowAlert({self.kind}:{self.key}, {self.window}, ${self.net_usd:,.0f})"
+
+class FlowAggregator:
+    """Per-address and per-exchange rolling net flows with threshold alerts
+
+    Addresses that resolve to an exchange count only towards that exchange,
+    so one burst of deposits raises one alert, not one per hot wallet too.
+    Each tracked key holds one RollingSum per window; the least recently
+    updated keys are evicted once max_keys is reached. Only flows built from
+    at least min_transfers transfers alert - single transfers have their own.
+    """
+
+    def __init__(self, windows=FLOW_WINDOWS, exchanges=EXCHANGE_ADDRESSES, max_keys=5000, min_transfers=2):
+        self.windows = windows
+        self.min_transfers = min_transfers
+        self.exchanges = {address.lower(): name for address, name in exchanges.items()}
+        self.max_keys = max_keys
+        self.flows = OrderedDict()
+        # (kind, key, window) currently above threshold - alert once per crossing
+        self.alerted = set()
+
+    def _update(self, kind, key, timestamp, usd, symbol, alerts):
+        entry = self.flows.get((kind, key))
+        if entry is None:
+            entry = ({name: RollingSum(seconds) for name, (seconds, _) in self.windows.items()}, set())
+            self.flows[(kind, key)] = entry
+            if len(self.flows) > self.max_keys:
+                (old_kind, old_key), _ = self.flows.popitem(last=False)
+                self.alerted = {a for a in self.alerted if a[:2] != (old_kind, old_key)}
+        else:
+            self.flows.move_to_end((kind, key))
+
+        sums, symbols = entry
+        symbols.add(symbol)
+
+        for name, (_, threshold) in self.windows.items():
+            rolling = sums[name]
+            rolling.add(timestamp, usd)
+            net = rolling.value(timestamp)
+            state = (kind, key, name)
+
+            if abs(net) >= threshold and rolling.count >= self.min_transfers:
+                if state not in self.alerted:
+                    self.alerted.add(state)
+                    alerts.append(FlowAlert(kind, key, name, net, threshold, sorted(symbols)))
+            else:
+                self.alerted.discard(state)
+
+    def add(self, transfer):
+        """Feed one WhaleTransfer, returns the FlowAlerts it triggered"""
+        alerts = []
+        usd = transfer.usd_value
+        ts = transfer.timestamp
+
+        for address, sign in ((transfer.from_addr, -1), (transfer.to_addr, 1)):
+            if not address or address == "Unknown":
+                continue
+
+            # Exchange wallets are tracked once, under the exchange name
+            exchange = self.exchanges.get(address.lower())
+            if exchange:
+                self._update("exchange", exchange, ts, sign * usd, transfer.symbol, alerts)
+            else:
+                self._update("address", address, ts, sign * usd, transfer.symbol, alerts)
+
+        return alerts
@@ -0,0 +1,73 @@
+"""Compact typed records shared by the news and whale bots"""
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+def to_epoch(value):
+    """Normalize a timestamp (epoch, datetime, ISO 8601 or RFC 822) to epoch seconds"""
+    if value is None or value == "":
+        return int(time.time())
+
+    if isinstance(value, (int, float)):
+        return int(value)
+
+    if isinstance(value, datetime):
+        dt = value
+    else:
+        text = str(value).strip()
+        try:
+            dt = datetime.fromisoformat(text.replace('Z', '+00:00'))
+        except ValueError:
+            try:
+                # RSS pubDate, e.g. "Mon, 19 Oct 2026 12:00:00 +0000"
+                dt = parsedate_to_datetime(text)
+            except (TypeError, ValueError):
+                return int(time.time())
+
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp())
+
+def format_epoch(epoch, fmt='%Y-%m-%d %H:%M'):
+    """Format epoch seconds as a UTC time string"""
+    return datetime.fromtimestamp(epoch, timezone.utc).strftime(fmt)
+
+class NewsArticle:
+    """A fetched news item (RSS, NewsAPI or Twitter)"""
+
+    __slots__ = ("title", "description", "url", "source", "kind", "published_at")
+
+    def __init__(self, title, description, url, source, kind, published_at=None):
+        self.title = (title or "").strip()
+        self.description = (description or "").strip()[:300]
+        self.url = url or ""
+        self.source = source
+        self.kind = kind
+        self.published_at = to_epoch(published_at)
+
+    def __repr__(self):
+        return f"NewsArticle({self.kind}, {self.title[:40]!r})"
+
+class WhaleTransfer:
+    """A large on-chain transfer"""
+
+    __slots__ = (
+        "symbol", "coin_name", "from_addr", "to_addr", "amount", "usd_value",
+        "hash", "chain", "timestamp", "explorer",
+    )
+
+    def __init__(self, symbol, coin_name, from_addr, to_addr, amount, usd_value,
+                 hash, chain, timestamp, explorer):
+        self.symbol = symbol
+        self.coin_name = coin_name
+        self.from_addr = from_addr or "Unknown"
+        self.to_addr = to_addr or "Unknown"
+        self.amount = float(amount)
+        self.usd_value = float(usd_value)
+        self.hash = hash or ""
+        self.chain = chain
+        self.timestamp = to_epoch(timestamp)
+        self.explorer = explorer
+
+    def __repr__(self):
+        return f"WhaleTransfer({self.symbol}, ${self.usd_value:,.0f}, {self.hash[:12]})"
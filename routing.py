@@ -0,0 +1,236 @@
+"""Fan-out of one analyzed event to many Discord webhooks
+
+Routes come from WEBHOOK_ROUTES_FILE, a JSON file with a list per stream:
+
+    {
+      "news": [
+        {"name": "vip", "url": "https://discord.com/api/webhooks/...",
+         "importance": ["CRITICAL", "HIGH"], "coins": ["BTC", "ETH"]}
+      ],
+      "whale": [
+        {"name": "big-btc", "url": "...", "coins": ["BTC"], "min_usd": 5000000,
+         "kinds": ["transfer", "flow"]}
+      ]
+    }
+
+Filters are optional (importance, sentiment, coins, kinds, min_usd); a route
+without a filter accepts every value. Without the file each stream has a
+single unfiltered route to its legacy webhook env variable.
+
+A Discord 429 does not count against the route's circuit breaker: the payload
+is redelivered after the retry_after Discord asks for, and later payloads to
+that route wait for the same moment instead of hitting the limit again.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+
+from circuit_breaker import CircuitOpenError, guarded_request
+
+WEBHOOK_ROUTES_FILE = os.getenv("WEBHOOK_ROUTES_FILE")
+WEBHOOK_DELIVERY_WORKERS = int(os.getenv("WEBHOOK_DELIVERY_WORKERS", "8"))
+WEBHOOK_MAX_ATTEMPTS = int(os.getenv("WEBHOOK_MAX_ATTEMPTS", "3"))
+WEBHOOK_MAX_RETRY_AFTER = float(os.getenv("WEBHOOK_MAX_RETRY_AFTER", "120"))
+# Redeliveries waiting on a rate limit, across all routes
+WEBHOOK_MAX_PENDING = int(os.getenv("WEBHOOK_MAX_PENDING", "100"))
+
+# Set-valued filters, matched against the event attribute of the same name
+ROUTE_FILTERS = ("importance", "sentiment", "coins", "kinds")
+
+logger = logging.getLogger(__name__)
+
+# Threads are only started on the first multi-route delivery
+executor = ThreadPoolExecutor(max_workers=WEBHOOK_DELIVERY_WORKERS)
+
+class Route:
+    """One webhook destination and its filters"""
+
+    __slots__ = ("name", "url", "filters", "min_usd")
+
+    def __init__(self, name, url, filters=None, min_usd=None):
+        self.name = name
+        self.url = url
+        self.filters = filters or {}
+        self.min_usd = min_usd
+
+    @classmethod
+    def from_config(cls, config, index):
+        filters = {
+            field: {str(value).upper() for value in config[field]}
+            for field in ROUTE_FILTERS if config.get(field)
+        }
+        return cls(config.get("name") or f"route-{index}", config["url"], filters, config.get("min_usd"))
+
+class RouteIndex:
+    """Precompiled route filters - matching costs one bitmask AND per filter
+
+    For every filter field each value maps to the bitmask of routes accepting
+    it; routes without that filter are in the field's wildcard mask. min_usd is
+    a sorted threshold list with prefix masks, so a USD value is one bisect.
+    """
+
+    def __init__(self, routes):
+        self.routes = routes
+        self.all_mask = (1 << len(routes)) - 1
+        self.masks = {}
+        self.wildcards = {}
+
+        for field in ROUTE_FILTERS:
+            values = {}
+            wildcard = 0
+            for i, route in enumerate(routes):
+                if field in route.filters:
+                    for value in route.filters[field]:
+                        values[value] = values.get(value, 0) | (1 << i)
+                else:
+                    wildcard |= 1 << i
+            self.masks[field] = values
+            self.wildcards[field] = wildcard
+
+        self.usd_wildcard = 0
+        thresholds = []
+        for i, route in enumerate(routes):
+            if route.min_usd is None:
+                self.usd_wildcard |= 1 << i
+            else:
+                thresholds.append((float(route.min_usd), 1 << i))
+        thresholds.sort()
+
+        self.usd_thresholds = [threshold for threshold, _ in thresholds]
+        self.usd_prefix_masks = [0]
+        for _, bit in thresholds:
+            self.usd_prefix_masks.append(self.usd_prefix_masks[-1] | bit)
+
+    def match(self, importance=None, sentiment=None, coins=(), kind=None, usd=None):
+        """Routes accepting an event with these attributes"""
+        event = {
+            "importance": [importance] if importance else [],
+            "sentiment": [sentiment] if sentiment else [],
+            "coins": coins or [],
+            "kinds": [kind] if kind else [],
+        }
+
+        mask = self.all_mask
+        for field in ROUTE_FILTERS:
+            field_mask = self.wildcards[field]
+            values = self.masks[field]
+            for value in event[field]:
+                field_mask |= values.get(str(value).upper(), 0)
+            mask &= field_mask
+            if not mask:
+                return []
+
+        usd_mask = self.usd_wildcard
+        if usd is not None:
+            usd_mask |= self.usd_prefix_masks[bisect_right(self.usd_thresholds, usd)]
+        mask &= usd_mask
+
+        return [route for i, route in enumerate(self.routes) if mask >> i & 1]
+
+def retry_after(response):
+    """Seconds Discord asks to wait after a 429 (JSON body, then header)"""
+    try:
+        return float(response.json()["retry_after"])
+    except Exception:
+        pass
+    try:
+        return float(response.headers.get("Retry-After", 1))
+    except ValueError:
+        return 1.0
+
+def load_routes(stream, default_url):
+    """Routes for a stream from WEBHOOK_ROUTES_FILE, or the legacy single webhook"""
+    if WEBHOOK_ROUTES_FILE:
+        try:
+            with open(WEBHOOK_ROUTES_FILE) as f:
+                config = json.load(f)
+            return [Route.from_config(entry, i) for i, entry in enumerate(config.get(stream, []))]
+        except Exception as e:
+            logger.error(f"Webhook routes load error: {e}")
+
+    return [Route("default", default_url)] if default_url else []
+
+class WebhookRouter:
+    """Delivers one payload to every matching route, concurrently"""
+
+    def __init__(self, stream, default_url):
+        self.stream = stream
+        self.index = RouteIndex(load_routes(stream, default_url))
+        # route name -> monotonic time its rate limit resets
+        self.blocked_until = {}
+        self.pending = 0
+        self.lock = threading.Lock()
+
+    @property
+    def routes(self):
+        return self.index.routes
+
+    def _post(self, route, payload, attempt=1):
+        """Send to one route; True if delivered or queued behind a rate limit"""
+        with self.lock:
+            wait = self.blocked_until.get(route.name, 0) - time.monotonic()
+        if wait > 0:
+            return self._redeliver(route, payload, attempt, wait)
+
+        try:
+            response = guarded_request(
+                f"discord:{self.stream}:{route.name}", "POST", route.url,
+                healthy_statuses=(429,), json=payload, timeout=10
+            )
+        except CircuitOpenError:
+            logger.warning(f"⚠️  Discord devresi açık ({route.name}) - alert gönderilmedi")
+            return False
+        except Exception as e:
+            logger.error(f"Discord Error ({route.name}): {e}")
+            return False
+
+        if response.status_code in [200, 204]:
+            return True
+
+        if response.status_code == 429:
+            delay = retry_after(response)
+            with self.lock:
+                self.blocked_until[route.name] = time.monotonic() + delay
+            return self._redeliver(route, payload, attempt + 1, delay)
+
+        logger.error(f"Discord Error ({route.name}): {response.status_code}")
+        return False
+
+    def _redeliver(self, route, payload, attempt, delay):
+        """Retry _post after delay on a timer thread, within the attempt and queue limits"""
+        with self.lock:
+            if attempt > WEBHOOK_MAX_ATTEMPTS or delay > WEBHOOK_MAX_RETRY_AFTER or self.pending >= WEBHOOK_MAX_PENDING:
+                logger.error(f"❌ Discord rate limit ({route.name}) - {delay:.1f}s beklenmeli, alert bırakıldı")
+                return False
+            self.pending += 1
+
+        logger.warning(f"⏳ Discord rate limit ({route.name}) - {delay:.1f}s sonra tekrar gönderilecek")
+        timer = threading.Timer(delay, self._deferred_post, (route, payload, attempt))
+        timer.daemon = True
+        timer.start()
+        return True
+
+    def _deferred_post(self, route, payload, attempt):
+        with self.lock:
+            self.pending -= 1
+        self._post(route, payload, attempt)
+
+    def deliver(self, payload, **event):
+        """Send payload to the routes matching event
+
+        Returns how many routes accepted it - delivered now, or queued for
+        redelivery after a Discord rate limit.
+        """
+        routes = self.index.match(**event)
+        if not routes:
+            return 0
+
+        if len(routes) == 1:
+            return int(self._post(routes[0], payload))
+
+        results = executor.map(lambda route: self._post(route, payload), routes)
+        return sum(results)
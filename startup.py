@@ -0,0 +1,48 @@
+"""Startup timing for the bots and an import-time profile CLI
+
+Import this module first in a bot so BOOT_STARTED is as close as possible
+to process start; mark() then logs each startup stage relative to it.
+
+Profile a bot's imports (slowest cumulative first):
+    python startup.py bot_news
+"""
+import time
+
+BOOT_STARTED = time.monotonic()
+
+marked = set()
+
+def mark(logger, stage):
+    """Log time since boot for a startup stage (only the first time)"""
+    if stage in marked:
+        return
+    marked.add(stage)
+    logger.info(f"⏱️  Startup: {stage} +{(time.monotonic() - BOOT_STARTED) * 1000:.0f}ms")
+
+def profile_imports(module, top=20):
+    """Run `python -X importtime -c 'import module'` and return the slowest entries"""
+    import subprocess
+    import sys
+
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True
+    )
+
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, self_us, cumulative_us, name = [part.strip() for part in line.replace("import time:", "|").split("|")]
+        entries.append((int(cumulative_us), int(self_us), name))
+
+    entries.sort(reverse=True)
+    return entries[:top]
+
+if __name__ == "__main__":
+    import sys
+
+    module = sys.argv[1] if len(sys.argv) > 1 else "bot_news"
+    print(f"{'cumulative ms':>14} {'self ms':>8}  module")
+    for cumulative_us, self_us, name in profile_imports(module):
+        print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>8.1f}  {name}")
@@ -0,0 +1,72 @@
+"""Minimal Solana JSON-RPC stand-in for the ingestion tests
+
+Answers batched getSlot, getBlocksWithLimit and getBlock over HTTP. blocks
+maps slot -> block dict, or slot -> int JSON-RPC error code for slots that
+are skipped (-32007/-32009) or not available yet (e.g. -32004).
+"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class SolanaRPCStub:
+    """Serve a fixed chain on 127.0.0.1 until stop()"""
+
+    def __init__(self, tip, blocks):
+        self.tip = tip
+        self.blocks = blocks
+        self.calls = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length))
+                batch = request if isinstance(request, list) else [request]
+                replies = [stub.answer(call) for call in batch]
+                body = json.dumps(replies if isinstance(request, list) else replies[0]).encode()
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_port}"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def answer(self, call):
+        method, params = call["method"], call.get("params", [])
+        self.calls.append((method, params))
+        reply = {"jsonrpc": "2.0", "id": call["id"]}
+
+        if method == "getSlot":
+            reply["result"] = self.tip
+        elif method == "getBlocksWithLimit":
+            start, limit = params[0], params[1]
+            reply["result"] = sorted(slot for slot in self.blocks if start <= slot <= self.tip)[:limit]
+        elif method == "getBlock":
+            block = self.blocks.get(params[0])
+            if isinstance(block, int):
+                reply["error"] = {"code": block, "message": f"Slot {params[0]} unavailable"}
+            elif block is None:
+                reply["error"] = {"code": -32009, "message": f"Slot {params[0]} was skipped"}
+            else:
+                reply["result"] = block
+        else:
+            reply["error"] = {"code": -32601, "message": "Method not found"}
+        return reply
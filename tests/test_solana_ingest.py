@@ -0,0 +1,160 @@
+import pytest
+
+import bot_whale
+from solana_rpc_stub import SolanaRPCStub
+
+USDC = "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v"
+USDT = "Es9vMFrzaCERmJfrF4H2FYD4KCoNkY11McCe8BenwNYB"
+SOL_PRICE = 150.0
+
+def sol_transfer(signature, sol, sender="Sender111", receiver="Receiver111"):
+    lamports = int(sol * bot_whale.LAMPORTS_PER_SOL)
+    fee = 5000
+    return {
+        "meta": {
+            "err": None,
+            "preBalances": [lamports + fee + 10**9, 10**9],
+            "postBalances": [10**9, 10**9 + lamports],
+            "preTokenBalances": [],
+            "postTokenBalances": [],
+        },
+        "transaction": {
+            "signatures": [signature],
+            "accountKeys": [{"pubkey": sender}, {"pubkey": receiver}],
+        },
+    }
+
+def token_balance(index, mint, owner, raw, decimals=6):
+    return {
+        "accountIndex": index,
+        "mint": mint,
+        "owner": owner,
+        "uiTokenAmount": {"amount": str(raw), "decimals": decimals},
+    }
+
+def token_transfer(signature, mint, raw, decimals=6):
+    return {
+        "meta": {
+            "err": None,
+            "preBalances": [10**9, 2039280, 2039280],
+            "postBalances": [10**9 - 5000, 2039280, 2039280],
+            "preTokenBalances": [
+                token_balance(1, mint, "Whale111", raw + 10**decimals, decimals),
+                token_balance(2, mint, "Exchange111", 0, decimals),
+            ],
+            "postTokenBalances": [
+                token_balance(1, mint, "Whale111", 10**decimals, decimals),
+                token_balance(2, mint, "Exchange111", raw, decimals),
+            ],
+        },
+        "transaction": {
+            "signatures": [signature],
+            "accountKeys": [{"pubkey": "Fee111"}, {"pubkey": "WhaleAta111"}, {"pubkey": "ExchangeAta111"}],
+        },
+    }
+
+def block(*transactions, block_time=1700000000):
+    return {"blockTime": block_time, "transactions": list(transactions)}
+
+@pytest.fixture
+def rpc(monkeypatch):
+    stubs = []
+
+    def serve(tip, blocks, cursor):
+        stub = SolanaRPCStub(tip, blocks).start()
+        stubs.append(stub)
+        monkeypatch.setattr(bot_whale, "SOLANA_RPC_URL", stub.url)
+        monkeypatch.setattr(bot_whale, "last_solana_slot", cursor)
+        monkeypatch.setattr(bot_whale, "get_coin_price", lambda coin_id: SOL_PRICE)
+        return stub
+
+    yield serve
+    for stub in stubs:
+        stub.stop()
+
+def get_block_calls(stub):
+    return [params[0] for method, params in stub.calls if method == "getBlock"]
+
+def test_cursor_advances_over_skipped_slots(rpc):
+    stub = rpc(105, {
+        101: block(sol_transfer("sig-101", 1000)),
+        102: -32007,
+        103: -32009,
+        104: block(sol_transfer("sig-104", 2000)),
+    }, cursor=100)
+
+    transfers = bot_whale.get_solana_large_transfers()
+
+    assert [transfer.hash for transfer in transfers] == ["sig-101", "sig-104"]
+    assert bot_whale.last_solana_slot == 104
+    assert get_block_calls(stub) == [101, 102, 103, 104]
+
+def test_cursor_stops_on_block_not_available_yet(rpc):
+    stub = rpc(105, {
+        101: block(sol_transfer("sig-101", 1000)),
+        102: -32004,
+        103: block(sol_transfer("sig-103", 1000)),
+    }, cursor=100)
+
+    transfers = bot_whale.get_solana_large_transfers()
+
+    assert [transfer.hash for transfer in transfers] == ["sig-101"]
+    assert bot_whale.last_solana_slot == 101
+
+    # Next tick resumes at the stalled block once it is available
+    stub.blocks[102] = block()
+    transfers = bot_whale.get_solana_large_transfers()
+
+    assert [transfer.hash for transfer in transfers] == ["sig-103"]
+    assert bot_whale.last_solana_slot == 103
+
+def test_tick_budget_leaves_cursor_for_next_tick(rpc, monkeypatch):
+    stub = rpc(105, {101: block(sol_transfer("sig-101", 1000))}, cursor=100)
+    monkeypatch.setattr(bot_whale, "SOLANA_TICK_BUDGET_SECONDS", 0)
+
+    assert bot_whale.get_solana_large_transfers() == []
+    assert bot_whale.last_solana_slot == 100
+    assert get_block_calls(stub) == []
+
+def test_lag_jump_moves_cursor_to_tip(rpc):
+    stub = rpc(20000, {101: block(sol_transfer("sig-101", 1000))}, cursor=100)
+
+    assert bot_whale.get_solana_large_transfers() == []
+    assert bot_whale.last_solana_slot == 19999
+    assert get_block_calls(stub) == []
+
+def test_decode_native_sol_lamports():
+    transfers = bot_whale.decode_solana_transaction(sol_transfer("sig", 1234.5), 1700000000, SOL_PRICE)
+
+    assert len(transfers) == 1
+    transfer = transfers[0]
+    assert transfer.symbol == "SOL"
+    assert transfer.amount == pytest.approx(1234.5)
+    assert transfer.usd_value == pytest.approx(1234.5 * SOL_PRICE)
+    assert (transfer.from_addr, transfer.to_addr) == ("Sender111", "Receiver111")
+    assert transfer.timestamp == 1700000000
+
+def test_decode_skips_sol_below_threshold_and_failed_transactions():
+    small = sol_transfer("sig", 10)
+    failed = sol_transfer("sig", 5000)
+    failed["meta"]["err"] = {"InstructionError": [0, "Custom"]}
+
+    assert bot_whale.decode_solana_transaction(small, 1700000000, SOL_PRICE) == []
+    assert bot_whale.decode_solana_transaction(failed, 1700000000, SOL_PRICE) == []
+
+@pytest.mark.parametrize("mint, symbol", [(USDC, "USDC"), (USDT, "USDT")])
+def test_decode_stablecoin_decimals(mint, symbol):
+    transfers = bot_whale.decode_solana_transaction(token_transfer("sig", mint, 250_000 * 10**6), 1700000000, SOL_PRICE)
+
+    assert len(transfers) == 1
+    transfer = transfers[0]
+    assert transfer.symbol == symbol
+    assert transfer.amount == pytest.approx(250_000)
+    assert transfer.usd_value == pytest.approx(250_000)
+    assert (transfer.from_addr, transfer.to_addr) == ("Whale111", "Exchange111")
+
+def test_decode_uses_reported_decimals():
+    # The same raw amount is 1000x smaller with 9 decimals - below the threshold
+    transfers = bot_whale.decode_solana_transaction(token_transfer("sig", USDC, 250_000 * 10**6, decimals=9), 1700000000, SOL_PRICE)
+
+    assert transfers == []
@@ -0,0 +1,114 @@
+"""Shared time-indexed whale transfer store (SQLite WAL) read by the news bot"""
+import os
+import sqlite3
+import threading
+import time
+
+WHALE_STORE_PATH = os.getenv("WHALE_STORE_PATH", "whale_transfers.db")
+WHALE_STORE_RETENTION_HOURS = int(os.getenv("WHALE_STORE_RETENTION_HOURS", "24"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transfers (
+    hash TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    chain TEXT,
+    amount REAL,
+    usd_value REAL,
+    from_addr TEXT,
+    to_addr TEXT,
+    exchange_flow REAL DEFAULT 0,
+    PRIMARY KEY (hash, symbol)
+);
+CREATE INDEX IF NOT EXISTS idx_transfers_symbol_ts ON transfers (symbol, ts);
+CREATE INDEX IF NOT EXISTS idx_transfers_ts ON transfers (ts);
+"""
+
+class CoinFlow:
+    """Observed whale activity for one coin over a time window"""
+
+    __slots__ = ("symbol", "count", "total_usd", "largest_usd", "exchange_in", "exchange_out")
+
+    def __init__(self, symbol, count, total_usd, largest_usd, exchange_in, exchange_out):
+        self.symbol = symbol
+        self.count = count
+        self.total_usd = total_usd or 0.0
+        self.largest_usd = largest_usd or 0.0
+        self.exchange_in = exchange_in or 0.0
+        self.exchange_out = exchange_out or 0.0
+
+    def summary(self):
+        """One-line human readable summary"""
+        text = f"{self.symbol}: {self.count} transfer, ${self.total_usd:,.0f} (en büyük ${self.largest_usd:,.0f})"
+        if self.exchange_in or self.exchange_out:
+            text += f", borsaya giriş ${self.exchange_in:,.0f} / çıkış ${self.exchange_out:,.0f}"
+        return text
+
+class WhaleStore:
+    """Whale transfers indexed by coin and time with bounded retention
+
+    The whale bot writes, the news bot opens the same file read-only; WAL mode
+    lets both work without blocking each other. Connections are per thread.
+    """
+
+    def __init__(self, path=WHALE_STORE_PATH, retention_hours=WHALE_STORE_RETENTION_HOURS, readonly=False):
+        self.path = path
+        self.retention_seconds = retention_hours * 3600
+        self.readonly = readonly
+        self.local = threading.local()
+
+    def _connect(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            if self.readonly:
+                conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, timeout=2)
+            else:
+                conn = sqlite3.connect(self.path, timeout=5)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.executescript(SCHEMA)
+            self.local.conn = conn
+        return conn
+
+    def record(self, transfers, exchanges=None):
+        """Insert transfers in one transaction and drop rows past retention
+
+        exchanges maps lowercase address -> exchange name; deposits to an
+        exchange are stored as positive exchange_flow, withdrawals negative.
+        """
+        exchanges = exchanges or {}
+        rows = []
+        for transfer in transfers:
+            exchange_flow = 0.0
+            if transfer.to_addr.lower() in exchanges:
+                exchange_flow += transfer.usd_value
+            if transfer.from_addr.lower() in exchanges:
+                exchange_flow -= transfer.usd_value
+            rows.append((
+                transfer.hash, transfer.symbol, transfer.timestamp, transfer.chain,
+                transfer.amount, transfer.usd_value, transfer.from_addr,
+                transfer.to_addr, exchange_flow
+            ))
+
+        conn = self._connect()
+        with conn:
+            conn.executemany("INSERT OR IGNORE INTO transfers VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            conn.execute("DELETE FROM transfers WHERE ts < ?", (int(time.time()) - self.retention_seconds,))
+
+    def recent_flows(self, symbols, minutes):
+        """Per-coin CoinFlow for the last `minutes`, only coins with activity"""
+        if not symbols:
+            return {}
+
+        placeholders = ",".join("?" for _ in symbols)
+        query = f"""
+            SELECT symbol, COUNT(*), SUM(usd_value), MAX(usd_value),
+                   SUM(CASE WHEN exchange_flow > 0 THEN exchange_flow ELSE 0 END),
+                   SUM(CASE WHEN exchange_flow < 0 THEN -exchange_flow ELSE 0 END)
+            FROM transfers
+            WHERE symbol IN ({placeholders}) AND ts >= ?
+            GROUP BY symbol
+        """
+        since = int(time.time()) - minutes * 60
+        rows = self._connect().execute(query, (*symbols, since)).fetchall()
+        return {row[0]: CoinFlow(*row) for row in rows}